@@ -3,4 +3,9 @@ from . import report
 from . import controllers
 # Add other imports if you have them, e.g.:
 # from . import wizard
-# from . import controllers 
\ No newline at end of file
+# from . import controllers
+
+
+def post_init_hook(env):
+    # Link MOs that already existed before install to their parent MO
+    env['mrp.production']._backfill_parent_production()
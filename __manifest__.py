@@ -1,6 +1,6 @@
 {
     'name': 'MRP Dashboard',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.2.0',
     'category': 'Manufacturing',
     'summary': 'Dashboard for Manufacturing Operations',
     'description': """
@@ -15,9 +15,13 @@
         'views/mrp_production_inherit.xml',
         'data/mrp_dashboard_data.xml',
         'data/mrp_auto_close_data.xml',
+        'data/mrp_dashboard_kpi_data.xml',
+        'data/mrp_charts_data.xml',
+        'data/mrp_dashboard_job_data.xml',
         'views/mrp_operation_dashboard_views.xml',
         'views/mrp_workorder_dashboard_views.xml',
         'views/mrp_charts_dashboard.xml',
+        'views/mrp_dashboard_job_views.xml',
         'views/scan_error_template.xml',
         'views/scan_success_template.xml',
         'report/mrp_bom_materials_report.xml',
@@ -47,6 +51,7 @@
     'application': True,
     'auto_install': False,
     'license': 'LGPL-3',
+    'post_init_hook': 'post_init_hook',
     'external_dependencies': {
         'python': ['xlsxwriter'],
     },
@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
 
-from . import workorder_controller 
\ No newline at end of file
+from . import workorder_controller 
+from . import mo_overview_controller
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+from odoo import http
+from odoo.exceptions import AccessError, MissingError
+from odoo.http import request
+
+# Models whose Excel export attachments are served by this controller. Job
+# results are linked to their job, so the own-job record rules decide who may
+# download them.
+EXPORT_RES_MODELS = ('mrp.production', 'mrp.dashboard.job')
+
+
+class MoOverviewController(http.Controller):
+
+    @http.route('/mrp/mo_overview/export/<int:attachment_id>', type='http', auth='user', methods=['GET'])
+    def mo_overview_export_download(self, attachment_id, **kwargs):
+        """Stream an MO Overview Excel export straight from the filestore
+
+        The attachment is only served to users who may read it, which means
+        read access to the record it is linked to, or being its creator when
+        it is linked to no record.
+        """
+        try:
+            attachment = request.env['ir.binary']._find_record(res_model='ir.attachment', res_id=attachment_id)
+        except (AccessError, MissingError):
+            raise request.not_found()
+        if attachment.res_model not in EXPORT_RES_MODELS:
+            raise request.not_found()
+        stream = request.env['ir.binary']._get_stream_from(attachment)
+        return stream.get_response(as_attachment=True)
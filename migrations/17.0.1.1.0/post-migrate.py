@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    # The record rule is noupdate, align it with the new company_id column
+    rule = env.ref('need_mrp_dashboard.rule_mo_dashboard_company', raise_if_not_found=False)
+    if rule:
+        rule.domain_force = "[('company_id', 'in', company_ids)]"
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+
+def migrate(cr, version):
+    # Chart rows are a recomputable cache without a company; drop them so the
+    # unique (date, company_id) key can be created. They are rebuilt on load.
+    cr.execute("DELETE FROM custom_mo_dashboard")
@@ -1,9 +1,12 @@
+from . import mrp_dashboard_kpi
 from . import mrp_dashboard
 from . import mrp_operation_dashboard
 from . import mrp_workorder_dashboard
 from . import mrp_charts_model
-from . import mrp_bom_report
+from . import mrp_bom_explosion
 from . import mrp_production_auto_close
 from . import mrp_material_overview
+from . import mrp_dashboard_job
+from . import stock_quant
 
 # -*- coding: utf-8 -*- 
\ No newline at end of file
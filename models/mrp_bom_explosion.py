@@ -0,0 +1,112 @@
+import logging
+from odoo import models, api
+
+_logger = logging.getLogger(__name__)
+
+
+class MrpBomExplosion(models.AbstractModel):
+    _name = 'mrp.bom.explosion'
+    _description = 'Multi-Level BOM Explosion'
+
+    @api.model
+    def _find_boms(self, products, company, memo=None, bom_type='normal'):
+        """Return ``{product_id: mrp.bom}`` for ``products``.
+
+        Products missing from the BOM index of ``memo`` are resolved together
+        with one _bom_find call. The index lives in the memo of one report
+        run, so BOM changes never leave it stale beyond that run.
+        """
+        memo = {} if memo is None else memo
+        index = memo.setdefault(('boms', company.id, bom_type), {})
+        missing = products.filtered(lambda product: product.id not in index)
+        if missing:
+            found = self.env['mrp.bom'].sudo()._bom_find(missing, company_id=company.id, bom_type=bom_type)
+            for product in missing:
+                index[product.id] = found[product].id
+        return {product.id: self.env['mrp.bom'].browse(index[product.id]) for product in products}
+
+    @api.model
+    def _prefetch_boms(self, products, company, memo=None):
+        """Resolve the BOMs of ``products`` and of all their sub-assemblies.
+
+        The product tree is walked breadth-first with one _find_boms call per
+        level, so the depth-first explosion afterwards only hits the index of
+        ``memo``.
+        """
+        seen_ids = set()
+        level = products
+        while level:
+            seen_ids.update(level.ids)
+            boms = self._find_boms(level, company, memo).values()
+            components = self.env['mrp.bom'].union(*boms).bom_line_ids.product_id
+            level = components.filtered(lambda product: product.id not in seen_ids)
+
+    @api.model
+    def _get_unit_lines(self, product, company, memo):
+        """Direct components of one unit of ``product`` (in its own UoM).
+
+        :return: list of ``(component, qty, uom)``, qty being expressed in the
+            UoM of the BOM line
+        """
+        key = ('lines', product.id, company.id)
+        if key not in memo:
+            bom = self._find_boms(product, company, memo)[product.id]
+            lines = []
+            if bom and bom.product_qty:
+                factor = product.uom_id._compute_quantity(1.0, bom.product_uom_id, round=False) / bom.product_qty
+                for line in bom.bom_line_ids:
+                    lines.append((line.product_id, line.product_qty * factor, line.product_uom_id))
+            memo[key] = lines
+        return memo[key]
+
+    @api.model
+    def _explode_unit(self, product, company, memo, path=()):
+        """Every component, at any depth, of one unit of ``product``.
+
+        Each sub-assembly is exploded once per (product, company) and scaled
+        for each occurrence. A component that is its own ancestor is a cycle:
+        it is logged and its branch skipped. A subtree cut short by a cycle
+        depends on the ancestors in ``path``, so it is not memoized.
+        :return: tuple ``(entries, pruned)``, entries being a list of
+            ``(component, qty, uom, path)`` where ``path`` holds the ids of the
+            sub-assemblies between ``product`` and the component, and pruned
+            telling whether a cycle was skipped in the subtree
+        """
+        key = ('tree', product.id, company.id)
+        if key in memo:
+            return memo[key], False
+        path = path + (product.id,)
+        entries = []
+        pruned = False
+        for component, qty, uom in self._get_unit_lines(product, company, memo):
+            if component.id in path:
+                _logger.warning("BOM cycle detected: %s is a component of itself, skipping this branch",
+                                component.display_name)
+                pruned = True
+                continue
+            entries.append((component, qty, uom, ()))
+            component_qty = uom._compute_quantity(qty, component.uom_id, round=False)
+            sub_entries, sub_pruned = self._explode_unit(component, company, memo, path)
+            pruned = pruned or sub_pruned
+            for sub_component, sub_qty, sub_uom, sub_path in sub_entries:
+                entries.append((sub_component, sub_qty * component_qty, sub_uom, (component.id,) + sub_path))
+        if not pruned:
+            memo[key] = entries
+        return entries, pruned
+
+    @api.model
+    def _explode(self, product, quantity, uom, company, memo=None):
+        """Explode ``quantity`` of ``product`` expressed in ``uom``.
+
+        :param memo: dict shared by the explosions of one report run, so that
+            sub-assemblies used several times are exploded only once
+        :return: list of ``(component, qty, uom, path)``, see ``_explode_unit``
+        """
+        memo = {} if memo is None else memo
+        self._prefetch_boms(product, company, memo)
+        unit_qty = uom._compute_quantity(quantity, product.uom_id, round=False)
+        entries, _pruned = self._explode_unit(product, company, memo)
+        return [
+            (component, qty * unit_qty, line_uom, path)
+            for component, qty, line_uom, path in entries
+        ]
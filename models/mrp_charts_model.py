@@ -1,58 +1,257 @@
+import logging
 from datetime import date, timedelta
+from psycopg2 import errors
 from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.misc import get_lang
+
+_logger = logging.getLogger(__name__)
+
+# MO states plotted on the chart, each stored in the column of the same name
+CHART_STATES = ['draft', 'confirmed', 'progress', 'done', 'cancel']
+
+# Supported chart granularities and the label format of their periods
+CHART_GRANULARITIES = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',
+    'month': '%Y-%m',
+}
 
 class MoDashboard(models.Model):
     _name = 'custom.mo.dashboard'
     _description = 'MO Status Count by Date'
 
     date = fields.Date(string="Date")
+    company_id = fields.Many2one('res.company', string="Company", required=True,
+        default=lambda self: self.env.company)
     draft = fields.Integer(string="Draft")
     confirmed = fields.Integer(string="Confirmed")
     progress = fields.Integer(string="In Progress")
     done = fields.Integer(string="Done")
     cancel = fields.Integer(string="Cancelled")
 
+    _sql_constraints = [
+        ('date_company_uniq', 'unique(date, company_id)', 'Only one chart row per day and company is allowed.'),
+    ]
+
+    @api.model
+    def _read_state_counts(self, start_date, end_date, company):
+        """Count MOs of ``company`` per creation day and state with one grouped query.
+
+        Days are UTC days, like the create_date bounds used by the chart.
+        :return: dict ``{date: {state: count}}``
+        """
+        groups = self.env['mrp.production'].sudo().with_context(tz='UTC')._read_group(
+            [
+                ('company_id', '=', company.id),
+                ('create_date', '>=', start_date),
+                ('create_date', '<', end_date + timedelta(days=1)),
+                ('state', 'in', CHART_STATES),
+            ],
+            groupby=['create_date:day', 'state'],
+            aggregates=['__count'],
+        )
+        state_counts = {}
+        for day, state, count in groups:
+            state_counts.setdefault(fields.Date.to_date(day), {})[state] = count
+        return state_counts
+
+    @api.model
+    def _rollup_days(self, days, company=None):
+        """Recount ``days`` for ``company`` and upsert them.
+
+        Only the rollup cron calls this, so chart loads never wait on the
+        lock below. Concurrent rollups are safe: a transaction-level advisory lock per
+        company makes them wait for each other, and the rows are written with
+        one idempotent INSERT ... ON CONFLICT (date, company_id) statement. A
+        rollup whose snapshot predates the rows committed by the previous one
+        keeps those rows instead of failing.
+        """
+        company = company or self.env.company
+        if not days:
+            return
+        self.env.cr.execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s), %s)", [self._table, company.id])
+
+        state_counts = self._read_state_counts(min(days), max(days), company)
+        now = self.env.cr.now()
+        values = []
+        for day in sorted(days):
+            day_counts = state_counts.get(day, {})
+            values.append(SQL(
+                "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                day, company.id, *[day_counts.get(state, 0) for state in CHART_STATES],
+                self.env.uid, now, self.env.uid, now,
+            ))
+        self.flush_model()
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute(SQL(
+                    """
+                    INSERT INTO %s (date, company_id, draft, confirmed, progress, done, cancel,
+                                    create_uid, create_date, write_uid, write_date)
+                    VALUES %s
+                    ON CONFLICT (date, company_id) DO UPDATE SET
+                        draft = EXCLUDED.draft,
+                        confirmed = EXCLUDED.confirmed,
+                        progress = EXCLUDED.progress,
+                        done = EXCLUDED.done,
+                        cancel = EXCLUDED.cancel,
+                        write_uid = EXCLUDED.write_uid,
+                        write_date = EXCLUDED.write_date
+                    """,
+                    SQL.identifier(self._table), SQL(", ").join(values),
+                ))
+        except errors.SerializationFailure:
+            # A concurrent generator committed the same days after our snapshot
+            _logger.debug("Chart rollup for company %s written concurrently, keeping its rows", company.id)
+        self.invalidate_model()
+
     @api.model
     def generate_data(self, start_date, end_date):
+        """Live MO state counts of the days of the range whose rollup row is outdated.
+
+        This never writes the rollup rows. Days never counted or flagged dirty
+        by a MO change are counted live for this read. The rollup cron, already
+        queued by the dirty markers, is only queued here for the days that
+        were never counted.
+        :return: dict ``{date: {state: count}}`` for the outdated days
+        """
         # Convert string dates to date objects if needed
         if isinstance(start_date, str):
             start_date = fields.Date.from_string(start_date)
         if isinstance(end_date, str):
             end_date = fields.Date.from_string(end_date)
 
-        # Delete existing records in the date range
-        self.search([
+        company = self.env.company
+        rows = self.search_read([
+            ('company_id', '=', company.id),
             ('date', '>=', start_date),
             ('date', '<=', end_date)
-        ]).unlink()
-
-        # Generate data for each day in the range
+        ], ['date'])
+        known_days = {row['date'] for row in rows}
+        dirty_days = set(self.env['custom.mo.dashboard.dirty'].sudo().search([
+            ('company_id', '=', company.id),
+            ('date', '>=', start_date),
+            ('date', '<=', end_date),
+        ]).mapped('date'))
+        missing_days = set()
         current_date = start_date
         while current_date <= end_date:
-            domain = [
-                ('create_date', '>=', current_date),
-                ('create_date', '<', current_date + timedelta(days=1))
-            ]
-            mos = self.env['mrp.production'].search(domain)
-
-            state_counts = {
-                'draft': 0,
-                'confirmed': 0,
-                'progress': 0,
-                'done': 0,
-                'cancel': 0,
-            }
-            for mo in mos:
-                if mo.state in state_counts:
-                    state_counts[mo.state] += 1
-
-            self.create({
-                'date': current_date,
-                'draft': state_counts['draft'],
-                'confirmed': state_counts['confirmed'],
-                'progress': state_counts['progress'],
-                'done': state_counts['done'],
-                'cancel': state_counts['cancel'],
-            })
-
+            if current_date not in known_days:
+                missing_days.add(current_date)
             current_date += timedelta(days=1)
+
+        days = missing_days | dirty_days
+        if not days:
+            return {}
+        self._mark_days_dirty({(day, company.id) for day in missing_days - dirty_days})
+        state_counts = self._read_state_counts(min(days), max(days), company)
+        return {
+            day: {state: state_counts.get(day, {}).get(state, 0) for state in CHART_STATES}
+            for day in days
+        }
+
+    @api.model
+    def _get_period_start(self, day, granularity):
+        """First day of the chart period of ``granularity`` containing ``day``"""
+        if granularity == 'week':
+            # week_start: 1 = Monday ... 7 = Sunday
+            week_start = int(get_lang(self.env).week_start) - 1
+            return day - timedelta(days=(day.weekday() - week_start) % 7)
+        if granularity == 'month':
+            return day.replace(day=1)
+        return day
+
+    @api.model
+    def get_chart_series(self, start_date, end_date, granularity='day'):
+        """Return the chart data for a range in ready-to-plot columnar form.
+
+        :param granularity: ``day``, ``week`` or ``month``
+        :return: dict with ``labels`` and one list of counts per state
+        """
+        if granularity not in CHART_GRANULARITIES:
+            raise ValueError(f"Unsupported chart granularity: {granularity}")
+        if isinstance(start_date, str):
+            start_date = fields.Date.from_string(start_date)
+        if isinstance(end_date, str):
+            end_date = fields.Date.from_string(end_date)
+
+        # Outdated days are plotted from their live counts, the others from
+        # their rollup rows.
+        day_counts = self.generate_data(start_date, end_date)
+        rows = self.search_read([
+            ('company_id', '=', self.env.company.id),
+            ('date', '>=', start_date),
+            ('date', '<=', end_date),
+            ('date', 'not in', list(day_counts)),
+        ], ['date'] + CHART_STATES)
+        for row in rows:
+            day_counts[row['date']] = {state: row[state] for state in CHART_STATES}
+
+        period_counts = {}
+        for day, counts in day_counts.items():
+            totals = period_counts.setdefault(self._get_period_start(day, granularity), dict.fromkeys(CHART_STATES, 0))
+            for state in CHART_STATES:
+                totals[state] += counts[state]
+        series = {'labels': [], **{state: [] for state in CHART_STATES}}
+        for period in sorted(period_counts):
+            series['labels'].append(period.strftime(CHART_GRANULARITIES[granularity]))
+            for state in CHART_STATES:
+                series[state].append(period_counts[period][state])
+        return series
+
+    @api.model
+    def _mark_days_dirty(self, day_companies):
+        """Flag ``(day, company_id)`` pairs for recount at commit time"""
+        if not day_companies:
+            return
+        pending = self.env.cr.precommit.data.setdefault('need_mrp_dashboard.chart_dirty_days', set())
+        if not pending:
+            self.env.cr.precommit.add(self._flush_dirty_days)
+        pending.update(day_companies)
+
+    def _flush_dirty_days(self):
+        """Append dirty-day markers and wake up the rollup cron.
+
+        Markers are only ever inserted by business transactions, never
+        updated, so concurrent MO changes do not contend on the rollup rows.
+        """
+        day_companies = self.env.cr.precommit.data.pop('need_mrp_dashboard.chart_dirty_days', set())
+        if not day_companies:
+            return
+        days, company_ids = zip(*sorted(day_companies))
+        self.env.cr.execute(
+            "INSERT INTO custom_mo_dashboard_dirty (date, company_id) SELECT unnest(%s::date[]), unnest(%s::int[])",
+            [list(days), list(company_ids)])
+        self.env.ref('need_mrp_dashboard.ir_cron_rollup_chart_days').sudo()._trigger()
+        self.env['ir.cron.trigger'].flush_model()
+
+    @api.model
+    def _cron_rollup_dirty_days(self):
+        """Recount dirty days in the background so chart loads stay read-only"""
+        self.env.cr.execute("SELECT id, date, company_id FROM custom_mo_dashboard_dirty")
+        markers = self.env.cr.fetchall()
+        days_by_company = {}
+        for _marker_id, day, company_id in markers:
+            days_by_company.setdefault(company_id, set()).add(day)
+        for company_id, days in days_by_company.items():
+            self._rollup_days(days, self.env['res.company'].browse(company_id))
+        if markers:
+            # Markers added since the read above stay for the next run
+            self.env.cr.execute(
+                "DELETE FROM custom_mo_dashboard_dirty WHERE id IN %s",
+                [tuple(marker_id for marker_id, _day, _company_id in markers)])
+            self.env['custom.mo.dashboard.dirty'].invalidate_model()
+        return True
+
+
+class MoDashboardDirtyDay(models.Model):
+    _name = 'custom.mo.dashboard.dirty'
+    _description = 'MO Chart Day Needing Recount'
+    _log_access = False
+
+    # Append-only: one row per business transaction and (day, company),
+    # consumed and deleted by the rollup cron
+    date = fields.Date(string="Date", required=True, index=True)
+    company_id = fields.Many2one('res.company', string="Company", required=True, ondelete='cascade')
@@ -1,6 +1,11 @@
-from odoo import models, fields, api, _
+import logging
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
 from odoo.tools.safe_eval import safe_eval
+from .mrp_dashboard_kpi import SNAPSHOT_COUNT_FIELDS
+
+_logger = logging.getLogger(__name__)
 
 class MrpDashboard(models.Model):
     _name = 'mrp.dashboard'
@@ -33,24 +38,65 @@ class MrpDashboard(models.Model):
     count_mo_late = fields.Integer(compute='_compute_mo_count', string='Late')
     count_mo_in_progress = fields.Integer(compute='_compute_mo_count', string='In Progress')
 
-    def _get_mo_domain(self):
-        """Get base domain for Manufacturing Orders"""
+    @api.model
+    @tools.ormcache('domain_text')
+    def _parse_custom_domain(self, domain_text):
+        """Evaluate a custom domain text once, the result only depends on the text.
+
+        :return: the domain as a tuple, so the cached value cannot be altered
+        :raise ValueError: if the text does not evaluate to a list
+        """
+        domain = safe_eval(domain_text)
+        if not isinstance(domain, (list, tuple)):
+            raise ValueError(f"Custom domain must be a list, got {type(domain).__name__}")
+        return tuple(tuple(leaf) if isinstance(leaf, list) else leaf for leaf in domain)
+
+    @api.model
+    @tools.ormcache('domain_text', 'self.env.uid', 'self.env.su', 'tuple(self.env.companies.ids)', 'self.env.lang')
+    def _compile_custom_domain(self, domain_text):
+        """Compile a custom domain into a WHERE fragment on mrp_production.
+
+        The fragment is compiled in the caller's environment, so subqueries
+        on related models apply that user's record rules; the cache key
+        holds the user and companies for that reason. Domains that need a
+        join are not compiled.
+        :return: ``SQL`` or None
+        """
+        query = self.env['mrp.production']._where_calc(list(self._parse_custom_domain(domain_text)))
+        if query._joins:
+            return None
+        return query.where_clause
+
+    def _get_custom_domain(self):
+        """Parsed custom domain of the card, empty if not set or invalid"""
+        if not self.custom_domain:
+            return []
+        try:
+            return list(self._parse_custom_domain(self.custom_domain))
+        except Exception as e:
+            # Only cards saved before the domain check existed can get here
+            _logger.warning("Ignoring invalid custom domain of dashboard card %s: %s", self.name, e)
+            return []
+
+    @api.constrains('custom_domain')
+    def _check_custom_domain(self):
+        """Reject custom domains that do not parse, compile or run on MOs"""
+        for record in self.filtered('custom_domain'):
+            try:
+                domain = list(record._parse_custom_domain(record.custom_domain))
+                with self.env.cr.savepoint():
+                    self.env['mrp.production'].search_count(domain, limit=1)
+            except Exception as e:
+                raise ValidationError(_("Invalid custom domain on card %s: %s") % (record.name, e))
+
+    def _get_base_mo_domain(self):
+        """Domain of the card without its custom domain"""
         base_domain = []
         
         # Add operation type filter if specified
         if self.operation_type_id:
             base_domain.append(('picking_type_id', '=', self.operation_type_id.id))
         
-        # Add custom domain if specified
-        if self.custom_domain:
-            try:
-                custom_domain = safe_eval(self.custom_domain)
-                if isinstance(custom_domain, list):
-                    base_domain.extend(custom_domain)
-            except Exception as e:
-                # Log error but continue with base domain
-                pass
-        
         # Fallback to legacy domain logic if no custom domain specified
         if not self.custom_domain:
             if self.name == 'All Manufacturing':
@@ -66,44 +112,67 @@ class MrpDashboard(models.Model):
         
         return base_domain
 
+    def _get_mo_domain(self):
+        """Get base domain for Manufacturing Orders"""
+        return self._get_base_mo_domain() + self._get_custom_domain()
+
+    def _get_mo_filter(self):
+        """Return ``(domain, where)`` selecting the card's Manufacturing Orders.
+
+        When the custom domain compiles to plain SQL, it is returned as the
+        ``where`` fragment so KPI refreshes skip evaluating and parsing it.
+        """
+        if self.custom_domain:
+            try:
+                where = self._compile_custom_domain(self.custom_domain)
+            except Exception:
+                where = None
+            if where is not None:
+                return self._get_base_mo_domain(), where
+        return self._get_mo_domain(), None
+
+    def _get_mo_kpis(self, now):
+        """Counter conditions evaluated on top of the card's base domain"""
+        if self.name == 'Completed Today' and not self.custom_domain:
+            # For Completed Today, all counts should show the same completed orders
+            return dict.fromkeys(SNAPSHOT_COUNT_FIELDS, [])
+        return {
+            'count_ready': [
+                ('state', 'in', ['confirmed', 'planned', 'draft']),
+                ('reservation_state', '=', 'assigned'),
+            ],
+            'count_waiting': [
+                ('state', 'in', ['confirmed', 'planned', 'draft']),
+                ('reservation_state', '=', 'waiting'),
+            ],
+            'count_late': [
+                ('state', 'in', ['confirmed', 'planned', 'progress', 'to_close', 'draft']),
+                ('date_start', '<', now),
+            ],
+            'count_in_progress': [
+                ('state', 'in', ['progress', 'to_close']),
+            ],
+        }
+
     @api.depends('name', 'operation_type_id', 'custom_domain')
     def _compute_mo_count(self):
+        # Counters are read from the KPI snapshot, which is kept up to date
+        # incrementally from mrp.production and repaired by a cron.
+        counts = self.env['mrp.dashboard.kpi.snapshot']._read_cards(self)
         for record in self:
-            base_domain = record._get_mo_domain()
-            
-            if record.name == 'Completed Today' and not record.custom_domain:
-                # For Completed Today, all counts should show the same completed orders
-                record.count_mo_ready = self.env['mrp.production'].search_count(base_domain)
-                record.count_mo_waiting = record.count_mo_ready
-                record.count_mo_late = record.count_mo_ready
-                record.count_mo_in_progress = record.count_mo_ready
-            else:
-                # Ready Manufacturing Orders
-                ready_domain = base_domain + [
-                    ('state', 'in', ['confirmed', 'planned', 'draft']),
-                    ('reservation_state', '=', 'assigned')
-                ]
-                record.count_mo_ready = self.env['mrp.production'].search_count(ready_domain)
-                
-                # Waiting Manufacturing Orders
-                waiting_domain = base_domain + [
-                    ('state', 'in', ['confirmed', 'planned', 'draft']),
-                    ('reservation_state', '=', 'waiting')
-                ]
-                record.count_mo_waiting = self.env['mrp.production'].search_count(waiting_domain)
-                
-                # Late Manufacturing Orders
-                late_domain = base_domain + [
-                    ('state', 'in', ['confirmed', 'planned', 'progress', 'to_close', 'draft']),
-                    ('date_start', '<', fields.Datetime.now())
-                ]
-                record.count_mo_late = self.env['mrp.production'].search_count(late_domain)
-
-                # In Progress Manufacturing Orders
-                in_progress_domain = base_domain + [
-                    ('state', 'in', ['progress', 'to_close'])
-                ]
-                record.count_mo_in_progress = self.env['mrp.production'].search_count(in_progress_domain)
+            card_counts = counts.get(record._origin.id, {})
+            record.count_mo_ready = card_counts.get('count_ready', 0)
+            record.count_mo_waiting = card_counts.get('count_waiting', 0)
+            record.count_mo_late = card_counts.get('count_late', 0)
+            record.count_mo_in_progress = card_counts.get('count_in_progress', 0)
+
+    def write(self, vals):
+        """Override write to drop the KPI snapshot when the card definition changes"""
+        result = super(MrpDashboard, self).write(vals)
+        # The snapshot is rebuilt on next read
+        if {'name', 'operation_type_id', 'custom_domain'} & set(vals):
+            self.env['mrp.dashboard.kpi.snapshot'].sudo().search([('dashboard_id', 'in', self.ids)]).unlink()
+        return result
 
     def get_mo_action(self):
         self.ensure_one()
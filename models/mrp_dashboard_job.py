@@ -0,0 +1,187 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Number of queued jobs run by one cron run before it re-triggers itself
+JOB_BATCH_SIZE = 5
+# Running jobs without progress for this long belong to a killed worker
+JOB_STALE_AFTER = timedelta(hours=2)
+
+
+class MrpDashboardJob(models.Model):
+    _name = 'mrp.dashboard.job'
+    _description = 'Dashboard Background Job'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(string='ชื่องาน', required=True, readonly=True)
+    job_type = fields.Selection([
+        ('mo_overview', 'MO Overview Excel'),
+        ('mo_cost_batch', 'MO Cost Batch Excel'),
+        ('bom_report', 'BOM Materials Report'),
+    ], string='ประเภทงาน', required=True, readonly=True)
+    user_id = fields.Many2one(
+        'res.users', string='ผู้สั่งงาน', required=True, readonly=True,
+        default=lambda self: self.env.user)
+    production_ids = fields.Many2many(
+        'mrp.production', string='Manufacturing Orders', readonly=True)
+    production_count = fields.Integer(string='จำนวน MO', readonly=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='สถานะ', default='queued', required=True, readonly=True, index=True)
+    progress = fields.Float(string='ความคืบหน้า (%)', readonly=True)
+    date_started = fields.Datetime(string='เริ่ม', readonly=True)
+    date_finished = fields.Datetime(string='เสร็จ', readonly=True)
+    attachment_id = fields.Many2one('ir.attachment', string='ไฟล์ผลลัพธ์', readonly=True, ondelete='set null')
+    error_message = fields.Text(string='ข้อผิดพลาด', readonly=True)
+
+    @api.model
+    def _enqueue(self, job_type, productions, name):
+        """Queue a job on ``productions`` and wake up the cron.
+
+        The user's finished jobs of the same type are dropped, with their
+        result attachments.
+        """
+        self.search([
+            ('user_id', '=', self.env.uid),
+            ('job_type', '=', job_type),
+            ('state', 'in', ['done', 'failed']),
+        ]).unlink()
+        job = self.create({
+            'name': name,
+            'job_type': job_type,
+            'production_ids': [(6, 0, productions.ids)],
+            'production_count': len(productions),
+        })
+        self.env.ref('need_mrp_dashboard.ir_cron_run_dashboard_jobs')._trigger()
+        return job
+
+    @api.model
+    def _claim_next(self):
+        """Lock the oldest queued job and mark it running.
+
+        Concurrent workers skip rows already locked by another worker, so a
+        job is only ever claimed once.
+        """
+        self.flush_model(['state'])
+        self.env.cr.execute("""
+            SELECT id FROM mrp_dashboard_job
+             WHERE state = 'queued'
+             ORDER BY id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        if not row:
+            return self.browse()
+        job = self.browse(row[0])
+        job.write({'state': 'running', 'progress': 0.0, 'date_started': fields.Datetime.now()})
+        return job
+
+    def _set_progress(self, done, total):
+        """Publish the progress from a separate cursor, visible before the job commits"""
+        progress = round(100.0 * done / total, 1) if total else 0.0
+        if not self.env.context.get('job_auto_commit'):
+            self.progress = progress
+            return
+        with self.env.registry.cursor() as cr:
+            cr.execute(
+                "UPDATE mrp_dashboard_job SET progress = %s, write_date = (now() at time zone 'UTC') WHERE id = %s",
+                (progress, self.id))
+
+    def _run(self):
+        """Run the job as its requesting user
+
+        :return: ir.attachment holding the result
+        """
+        self.ensure_one()
+        productions = self.production_ids.with_user(self.user_id)
+        if self.job_type == 'mo_overview':
+            return productions._write_mo_overview_export(self._name, self.id)
+        if self.job_type == 'mo_cost_batch':
+            return productions._write_mo_batch_export(self._name, self.id, progress_callback=self._set_progress)
+        if self.job_type == 'bom_report':
+            return productions._write_bom_materials_report(self._name, self.id)
+        raise ValueError(f"Unknown job type: {self.job_type}")
+
+    def _execute(self, auto_commit):
+        """Run a claimed job and record its outcome"""
+        self.ensure_one()
+        job = self.with_context(job_auto_commit=auto_commit)
+        try:
+            with self.env.cr.savepoint():
+                attachment = job._run()
+            if auto_commit:
+                # Persist the result before touching the job row, which was
+                # updated by the progress cursor since this transaction began
+                self.env.cr.commit()
+                self.invalidate_recordset()
+            self.write({
+                'state': 'done',
+                'progress': 100.0,
+                'attachment_id': attachment.id,
+                'error_message': False,
+                'date_finished': fields.Datetime.now(),
+            })
+            self._notify_user('Job Done', f"{self.name}: พร้อมดาวน์โหลดแล้ว", 'success')
+        except Exception as e:
+            _logger.warning(f"Dashboard job {self.id} ({self.job_type}) failed: {str(e)}")
+            if auto_commit:
+                self.env.cr.rollback()
+                self.invalidate_recordset()
+            self.write({'state': 'failed', 'error_message': str(e), 'date_finished': fields.Datetime.now()})
+            self._notify_user('Job Failed', f"{self.name}: เกิดข้อผิดพลาด", 'danger')
+        if auto_commit:
+            self.env.cr.commit()
+
+    def _notify_user(self, title, message, notification_type):
+        self.env['bus.bus']._sendone(self.user_id.partner_id, 'simple_notification', {
+            'title': title,
+            'message': message,
+            'type': notification_type,
+        })
+
+    @api.model
+    def _fail_stale_jobs(self):
+        """Fail running jobs whose worker died without recording an outcome"""
+        stale_jobs = self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - JOB_STALE_AFTER),
+        ])
+        if stale_jobs:
+            stale_jobs.write({
+                'state': 'failed',
+                'error_message': 'งานถูกหยุดกลางคัน (worker interrupted)',
+                'date_finished': fields.Datetime.now(),
+            })
+
+    @api.model
+    def _cron_run_jobs(self, auto_commit=True):
+        """Run queued jobs one at a time, re-triggering the cron while some are left.
+
+        Each job is claimed and committed before it runs, so other workers
+        skip it and its progress can be followed from the job list.
+        """
+        self._fail_stale_jobs()
+        for _index in range(JOB_BATCH_SIZE):
+            job = self._claim_next()
+            if not job:
+                return True
+            if auto_commit:
+                self.env.cr.commit()
+            job._execute(auto_commit)
+        if self.search_count([('state', '=', 'queued')]):
+            self.env.ref('need_mrp_dashboard.ir_cron_run_dashboard_jobs')._trigger()
+        return True
+
+    def action_download(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/mrp/mo_overview/export/{self.attachment_id.id}',
+            'target': 'new',
+        }
@@ -0,0 +1,319 @@
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+# Operators supported in KPI conditions, mapped to their SQL spelling
+KPI_OPERATORS = {
+    '=': '=',
+    '!=': '!=',
+    '<': '<',
+    '<=': '<=',
+    '>': '>',
+    '>=': '>=',
+    'in': 'IN',
+    'not in': 'NOT IN',
+}
+
+# Counters stored per card and picking type in the KPI snapshot
+SNAPSHOT_COUNT_FIELDS = ['count_ready', 'count_waiting', 'count_late', 'count_in_progress']
+
+# Snapshot field pointing to each kind of dashboard card
+SNAPSHOT_CARD_FIELDS = {
+    'mrp.dashboard': 'dashboard_id',
+    'mrp.operation.dashboard': 'operation_dashboard_id',
+}
+
+
+class MrpDashboardKpiMixin(models.AbstractModel):
+    _name = 'mrp.dashboard.kpi.mixin'
+    _description = 'Dashboard KPI Engine'
+
+    @api.model
+    def _kpi_condition_sql(self, table, conditions):
+        """Compile a list of ``(field, operator, value)`` into an SQL condition.
+
+        Conditions are AND-ed and may only reference stored columns of the
+        counted model itself. An empty list matches every row.
+        """
+        if not conditions:
+            return SQL("TRUE")
+        clauses = []
+        for fname, operator, value in conditions:
+            if operator not in KPI_OPERATORS:
+                raise ValueError(f"Unsupported KPI operator: {operator}")
+            if operator in ('in', 'not in'):
+                value = tuple(value)
+                if not value:
+                    clauses.append(SQL("FALSE") if operator == 'in' else SQL("TRUE"))
+                    continue
+            clauses.append(SQL(f"%s {KPI_OPERATORS[operator]} %s", SQL.identifier(table, fname), value))
+        return SQL("(%s)", SQL(" AND ").join(clauses))
+
+    @api.model
+    def _read_kpi_counts(self, res_model, domain, kpis, groupby=None, where=None):
+        """Evaluate several counters over ``domain`` with a single query.
+
+        :param res_model: name of the counted model (e.g. ``mrp.production``)
+        :param domain: base domain shared by all counters, record rules apply
+        :param kpis: dict mapping a counter name to its list of conditions
+        :param groupby: optional stored column to split the counters by
+        :param where: optional precompiled ``SQL`` condition AND-ed to ``domain``
+        :return: dict mapping each counter name to its count, or, when
+            ``groupby`` is given, dict mapping each group value to such a dict
+        """
+        Model = self.env[res_model]
+        Model.flush_model()
+        query = Model._search(domain)
+        if where is not None:
+            query.add_where(where)
+        names = list(kpis)
+        columns = [
+            SQL("COUNT(*) FILTER (WHERE %s)", self._kpi_condition_sql(query.table, kpis[name]))
+            for name in names
+        ]
+        if groupby:
+            group_column = SQL.identifier(query.table, groupby)
+            self.env.cr.execute(SQL("%s GROUP BY %s", query.select(group_column, *columns), group_column))
+            return {row[0]: dict(zip(names, row[1:])) for row in self.env.cr.fetchall()}
+        self.env.cr.execute(query.select(*columns))
+        row = self.env.cr.fetchone() or [0] * len(names)
+        return dict(zip(names, row))
+
+
+class MrpDashboardKpiSnapshot(models.Model):
+    _name = 'mrp.dashboard.kpi.snapshot'
+    _inherit = ['mrp.dashboard.kpi.mixin']
+    _description = 'Dashboard KPI Snapshot'
+
+    dashboard_id = fields.Many2one('mrp.dashboard', string='Dashboard Card', ondelete='cascade', index=True)
+    operation_dashboard_id = fields.Many2one(
+        'mrp.operation.dashboard', string='Operation Card', ondelete='cascade', index=True)
+    picking_type_id = fields.Many2one(
+        'stock.picking.type', string='Operation Type', required=True, ondelete='cascade', index=True)
+    company_id = fields.Many2one(related='picking_type_id.company_id', store=True)
+    count_ready = fields.Integer('Ready')
+    count_waiting = fields.Integer('Waiting')
+    count_late = fields.Integer('Late')
+    count_in_progress = fields.Integer('In Progress')
+
+    _sql_constraints = [
+        ('dashboard_picking_type_uniq', 'UNIQUE(dashboard_id, picking_type_id)',
+         'A dashboard card has one snapshot row per operation type.'),
+        ('operation_dashboard_picking_type_uniq', 'UNIQUE(operation_dashboard_id, picking_type_id)',
+         'An operation card has one snapshot row per operation type.'),
+    ]
+
+    @api.model
+    def _get_card_field(self, cards):
+        return SNAPSHOT_CARD_FIELDS[cards._name]
+
+    @api.model
+    def _get_partition_types(self, cards):
+        """Picking types each card is split by in the snapshot.
+
+        :return: dict ``{card: stock.picking.type}``
+        """
+        all_types = None
+        partitions = {}
+        for card in cards:
+            if card.operation_type_id:
+                partitions[card] = card.operation_type_id
+                continue
+            if all_types is None:
+                all_types = self.env['stock.picking.type'].with_context(active_test=False).search(
+                    [('code', '=', 'mrp_operation')])
+            partitions[card] = all_types
+        return partitions
+
+    @api.model
+    def _count_cards(self, cards, picking_type_ids=None):
+        """Count the counters of ``cards`` live, without touching the snapshot.
+
+        Cards sharing a base domain are counted together, with one query split
+        by picking type. When ``picking_type_ids`` is given, only those
+        partitions are counted.
+        :return: dict ``{(card_id, picking_type_id): counters}``
+        """
+        self = self.sudo()
+        cards = cards.sudo()
+        now = fields.Datetime.now()
+
+        groups = {}
+        for card, partition_types in self._get_partition_types(cards).items():
+            if picking_type_ids is not None:
+                partition_types = partition_types.filtered(lambda t: t.id in picking_type_ids)
+            if not partition_types:
+                continue
+            domain, where = card._get_mo_filter()
+            domain = domain + [('picking_type_id', 'in', partition_types.ids)]
+            kpis = card._get_mo_kpis(now)
+            group = groups.setdefault((repr(domain), repr(where), repr(kpis)), [domain, where, kpis, []])
+            group[3].append((card, partition_types))
+
+        empty = dict.fromkeys(SNAPSHOT_COUNT_FIELDS, 0)
+        result = {}
+        for domain, where, kpis, members in groups.values():
+            counts = self._read_kpi_counts('mrp.production', domain, kpis, groupby='picking_type_id', where=where)
+            for card, partition_types in members:
+                for picking_type in partition_types:
+                    result[card.id, picking_type.id] = dict(empty, **counts.get(picking_type.id, {}))
+        return result
+
+    @api.model
+    def _refresh_cards(self, cards, picking_type_ids=None):
+        """Recount the snapshot rows of ``cards`` and upsert them.
+
+        Rows are written with ``INSERT ... ON CONFLICT DO UPDATE`` on the
+        (card, picking type) unique keys, so concurrent refreshes never
+        create duplicate rows. Only called from the crons.
+        """
+        counts = self._count_cards(cards, picking_type_ids)
+        if not counts:
+            return
+        card_field = self._get_card_field(cards)
+        picking_types = self.env['stock.picking.type'].sudo().browse({type_id for _card_id, type_id in counts})
+        company_by_type = {picking_type.id: picking_type.company_id.id or None for picking_type in picking_types}
+        now = fields.Datetime.now()
+        uid = self.env.uid
+        values = SQL(", ").join(
+            SQL("(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                card_id, type_id, company_by_type[type_id],
+                *(card_counts[fname] for fname in SNAPSHOT_COUNT_FIELDS),
+                uid, now, uid, now)
+            for (card_id, type_id), card_counts in counts.items()
+        )
+        column = SQL.identifier(card_field)
+        self.env.cr.execute(SQL("""
+            INSERT INTO mrp_dashboard_kpi_snapshot
+                   (%s, picking_type_id, company_id, count_ready, count_waiting, count_late, count_in_progress,
+                    create_uid, create_date, write_uid, write_date)
+            VALUES %s
+            ON CONFLICT (%s, picking_type_id) DO UPDATE
+               SET count_ready = EXCLUDED.count_ready,
+                   count_waiting = EXCLUDED.count_waiting,
+                   count_late = EXCLUDED.count_late,
+                   count_in_progress = EXCLUDED.count_in_progress,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, column, values, column))
+        self.invalidate_model()
+
+    @api.model
+    def _read_cards(self, cards):
+        """Return ``{card_id: counters}`` for ``cards`` from the snapshot.
+
+        This never writes the snapshot. Partitions that were never counted or
+        are flagged stale are counted live for this read. The refresh cron,
+        already triggered by the stale markers, is only triggered here for
+        partitions that were never counted.
+        """
+        allowed_company_ids = set(self.env.companies.ids)
+        self = self.sudo()
+        card_field = self._get_card_field(cards)
+        cards = cards.filtered('id').sudo()
+        rows = self.search([(card_field, 'in', cards.ids)])
+        counts = {
+            (row[card_field].id, row.picking_type_id.id): {fname: row[fname] for fname in SNAPSHOT_COUNT_FIELDS}
+            for row in rows
+        }
+        stale_type_ids = {
+            picking_type.id for [picking_type] in self.env['mrp.dashboard.kpi.stale']._read_group([], ['picking_type_id'])
+        }
+
+        partitions = self._get_partition_types(cards)
+        live_cards = self.env[cards._name]
+        live_type_ids = set()
+        uncounted = False
+        for card, partition_types in partitions.items():
+            missing_ids = {type_id for type_id in partition_types.ids if (card.id, type_id) not in counts}
+            outdated_ids = missing_ids | (set(partition_types.ids) & stale_type_ids)
+            if outdated_ids:
+                live_cards |= card
+                live_type_ids |= outdated_ids
+            uncounted = uncounted or bool(missing_ids)
+        if live_cards:
+            counts.update(self._count_cards(live_cards, picking_type_ids=live_type_ids))
+        if uncounted:
+            self.env.ref('need_mrp_dashboard.ir_cron_refresh_stale_kpi_snapshot')._trigger()
+
+        result = {}
+        for card, partition_types in partitions.items():
+            totals = result.setdefault(card.id, dict.fromkeys(SNAPSHOT_COUNT_FIELDS, 0))
+            for picking_type in partition_types:
+                if picking_type.company_id and picking_type.company_id.id not in allowed_company_ids:
+                    continue
+                for fname, value in counts.get((card.id, picking_type.id), {}).items():
+                    totals[fname] += value
+        return result
+
+    @api.model
+    def _mark_stale(self, picking_type_ids):
+        """Flag the partitions of ``picking_type_ids`` for recount at commit time"""
+        if not picking_type_ids:
+            return
+        pending = self.env.cr.precommit.data.setdefault('need_mrp_dashboard.kpi_stale_types', set())
+        if not pending:
+            self.env.cr.precommit.add(self._flush_stale)
+        pending.update(picking_type_ids)
+
+    def _flush_stale(self):
+        """Append stale markers and wake up the refresh cron.
+
+        Markers are only ever inserted by business transactions, never
+        updated, so concurrent MO changes do not contend on shared rows.
+        """
+        picking_type_ids = self.env.cr.precommit.data.pop('need_mrp_dashboard.kpi_stale_types', set())
+        if not picking_type_ids:
+            return
+        self.env.cr.execute(
+            "INSERT INTO mrp_dashboard_kpi_stale (picking_type_id) SELECT unnest(%s::int[])",
+            [sorted(picking_type_ids)])
+        self.env.ref('need_mrp_dashboard.ir_cron_refresh_stale_kpi_snapshot').sudo()._trigger()
+        self.env['ir.cron.trigger'].flush_model()
+
+    @api.model
+    def _get_snapshot_cards(self):
+        return [
+            # Every dashboard card is read through the snapshot, see _compute_mo_count
+            self.env['mrp.dashboard'].search([]),
+            self.env['mrp.operation.dashboard'].search([('operation_type_id.code', '=', 'mrp_operation')]),
+        ]
+
+    @api.model
+    def _cron_refresh_stale(self):
+        """Recount the partitions flagged stale and the cards never counted yet"""
+        self.env.cr.execute("SELECT id, picking_type_id FROM mrp_dashboard_kpi_stale")
+        markers = self.env.cr.fetchall()
+        stale_type_ids = {type_id for _marker_id, type_id in markers}
+        for cards in self._get_snapshot_cards():
+            counted_ids = set(self.search([(self._get_card_field(cards), 'in', cards.ids)]).mapped(
+                self._get_card_field(cards)).ids)
+            missing_cards = cards.filtered(lambda c: c.id not in counted_ids)
+            if missing_cards:
+                self._refresh_cards(missing_cards)
+            if stale_type_ids:
+                self._refresh_cards(cards - missing_cards, picking_type_ids=stale_type_ids)
+        if markers:
+            # Markers added since the read above stay for the next run
+            self.env.cr.execute(
+                "DELETE FROM mrp_dashboard_kpi_stale WHERE id IN %s",
+                [tuple(marker_id for marker_id, _type_id in markers)])
+            self.env['mrp.dashboard.kpi.stale'].invalidate_model()
+        return True
+
+    @api.model
+    def _cron_refresh_all(self):
+        """Recount every card to repair drift (time-based counters, custom domains)"""
+        for cards in self._get_snapshot_cards():
+            self._refresh_cards(cards)
+        return True
+
+
+class MrpDashboardKpiStale(models.Model):
+    _name = 'mrp.dashboard.kpi.stale'
+    _description = 'Dashboard KPI Stale Partition'
+    _log_access = False
+
+    # Append-only: one row per business transaction and picking type,
+    # consumed and deleted by the refresh cron
+    picking_type_id = fields.Many2one(
+        'stock.picking.type', string='Operation Type', required=True, ondelete='cascade', index=True)
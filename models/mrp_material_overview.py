@@ -1,90 +1,160 @@
+from contextlib import contextmanager
 from odoo import models, fields, api
 import logging
+import re
 
 _logger = logging.getLogger(__name__)
 
+# Key of the per-transaction memo of MO trees in cr.precommit.data
+MO_DESCENDANTS_KEY = 'need_mrp_dashboard.mo_descendants'
+# Key of the memo of MO cost breakdowns, only set while a report is built
+MO_COSTS_KEY = 'need_mrp_dashboard.mo_costs'
+# Key of the per-transaction memo of delivery ids per MO tree
+MO_DELIVERIES_KEY = 'need_mrp_dashboard.mo_deliveries'
+# Name prefix of the MO Overview Excel exports attached to their MO
+MO_OVERVIEW_EXPORT_PREFIX = 'MO_Overview_'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+# Multi-MO cost exports: name prefix, and largest selection built in the request
+MO_COST_BATCH_EXPORT_PREFIX = 'MO_Cost_Batch_'
+MO_EXPORT_BATCH_SYNC_LIMIT = 50
+# Largest MO tree whose overview export is built in the request
+MO_OVERVIEW_SYNC_SUB_MO_LIMIT = 30
+BATCH_SUMMARY_SHEET_NAME = 'Batch Summary'
+# Amount columns of the batch summary sheet, in cost_summary keys
+BATCH_COST_KEYS = ['material_cost', 'labor_cost', 'sub_mo_labor_cost', 'shipping_cost',
+                   'sub_mo_shipping_cost', 'total_cost', 'unit_cost']
+BATCH_COST_FIRST_COLUMN = 6
+# Stored MO costs computed by _compute_mo_costs
+MO_COST_FIELDS = ['mo_material_cost', 'mo_operation_cost', 'mo_sub_mo_cost', 'mo_total_cost', 'mo_real_cost']
+
 class MrpProductionMaterialOverview(models.Model):
     _inherit = 'mrp.production'
 
+    # Sub MOs point to their parent MO through origin, index it for the tree lookup
+    origin = fields.Char(index=True)
+
+    # Stored costs, kept up to date by their dependencies for sorting and reporting
+    mo_material_cost = fields.Float(
+        string='ต้นทุนวัตถุดิบ (แผน)', compute='_compute_mo_costs', store=True, recursive=True,
+        help='Planned cost of the raw materials not produced by a sub MO')
+    mo_operation_cost = fields.Float(
+        string='ต้นทุน Operation (แผน)', compute='_compute_mo_costs', store=True, recursive=True,
+        help='Planned cost of the work orders')
+    mo_sub_mo_cost = fields.Float(
+        string='ต้นทุน MO ย่อย', compute='_compute_mo_costs', store=True, recursive=True,
+        help='Planned total cost of the direct sub MOs, including their own sub MOs')
+    mo_total_cost = fields.Float(
+        string='ต้นทุนรวม (แผน)', compute='_compute_mo_costs', store=True, recursive=True)
+    mo_real_cost = fields.Float(
+        string='ต้นทุนจริง', compute='_compute_mo_costs', store=True, recursive=True,
+        help='Cost of the consumed materials, finished work orders and done sub MOs')
+
+    def _get_mo_descendant_depths(self):
+        """หา MO ย่อยทั้งหมดของแต่ละ MO ด้วย recursive query เดียว
+
+        Sub MOs are followed through both ``origin = name`` and
+        parent_production_id links, without depth or width limits. Results
+        are memoized for the current transaction.
+        :return: dict ``{mo_id: {descendant_id: depth}}``, descendants ordered by depth
+        """
+        memo = self.env.cr.precommit.data.setdefault(MO_DESCENDANTS_KEY, {})
+        missing_ids = [mo_id for mo_id in self.ids if mo_id not in memo]
+        if missing_ids:
+            self.flush_model(['name', 'origin', 'parent_production_id'])
+            self.env.cr.execute("""
+                WITH RECURSIVE descendant(root_id, id, depth, path) AS (
+                    SELECT root.id, root.id, 0, ARRAY[root.id]
+                      FROM mrp_production root
+                     WHERE root.id IN %(root_ids)s
+                    UNION ALL
+                    SELECT d.root_id, child.id, d.depth + 1, d.path || child.id
+                      FROM descendant d
+                      JOIN mrp_production parent ON parent.id = d.id
+                      JOIN mrp_production child
+                        ON (child.origin = parent.name AND parent.name != '/')
+                        OR child.parent_production_id = parent.id
+                     WHERE child.id != ALL(d.path)
+                )
+                SELECT root_id, id, MIN(depth)
+                  FROM descendant
+                 WHERE depth > 0
+                 GROUP BY root_id, id
+                 ORDER BY root_id, MIN(depth), id
+            """, {'root_ids': tuple(missing_ids)})
+            for mo_id in missing_ids:
+                memo[mo_id] = {}
+            for root_id, mo_id, depth in self.env.cr.fetchall():
+                memo[root_id][mo_id] = depth
+        return {mo_id: memo[mo_id] for mo_id in self.ids}
+
+    @api.model
+    def _invalidate_mo_descendants(self):
+        """Drop the memoized MO trees after a change of the links between MOs"""
+        self.env.cr.precommit.data.pop(MO_DESCENDANTS_KEY, None)
+        self.env.cr.precommit.data.pop(MO_COSTS_KEY, None)
+        self.env.cr.precommit.data.pop(MO_DELIVERIES_KEY, None)
+
     def _get_child_manufacturing_orders(self):
-        """หา MO ย่อยทั้งหมดที่ reference มา MO หลัก (with safety limits)"""
+        """หา MO ย่อยทั้งหมดที่ reference มา MO หลัก เรียงตามระดับความลึก"""
         if not self.name or self.name == '/':
             return []
-            
-        child_mo_ids = []
-        processed_names = set()  # ป้องกัน infinite loop
-        
-        def find_children_recursive(mo_name, depth=0):
-            # จำกัดความลึกไม่เกิน 3 ระดับ
-            if depth > 3:
-                return
-                
-            # ป้องกัน infinite loop
-            if mo_name in processed_names:
-                return
-                
-            processed_names.add(mo_name)
-            
-            try:
-                # หา MO ที่มี origin เป็น mo_name
-                direct_children = self.env['mrp.production'].search([
-                    ('origin', '=', mo_name),
-                    ('id', '!=', self.id)
-                ], limit=20)  # จำกัดไม่เกิน 20 รายการ
-                
-                for child in direct_children:
-                    if child.id not in child_mo_ids:
-                        child_mo_ids.append(child.id)
-                        # Recursive หา MO ย่อยของ MO ย่อย
-                        find_children_recursive(child.name, depth + 1)
-                        
-            except Exception as e:
-                _logger.error(f"Error in recursive child search: {str(e)}")
-                
-        # เริ่มค้นหาจาก MO หลัก
-        find_children_recursive(self.name)
-        
-        return child_mo_ids
-    
+        child_mo_ids = list(self._get_mo_descendant_depths()[self.id])
+        # Keep the record rules of the former search based lookup
+        return self.browse(child_mo_ids)._filter_access_rules('read').ids
+
+    def _find_delivery_ids(self):
+        """หา Deliveries ของ MO เหล่านี้ด้วย SQL เดียว
+
+        A picking belongs to the MOs when it is an outgoing, not cancelled
+        picking whose origin is one of their names, or when it holds a not
+        cancelled move produced by one of them. Both lookups use indexed
+        columns (stock_picking.origin, stock_move.production_id).
+        :return: list of stock.picking ids, access rules not applied
+        """
+        if not self:
+            return []
+        self.env['stock.picking'].flush_model(['origin', 'picking_type_id', 'state'])
+        self.env['stock.picking.type'].flush_model(['code'])
+        self.env['stock.move'].flush_model(['production_id', 'picking_id', 'state'])
+        names = tuple(name for name in self.mapped('name') if name) or (None,)
+        self.env.cr.execute("""
+            SELECT picking.id
+              FROM stock_picking picking
+              JOIN stock_picking_type picking_type ON picking_type.id = picking.picking_type_id
+             WHERE picking.origin IN %(names)s
+               AND picking_type.code = 'outgoing'
+               AND picking.state != 'cancel'
+            UNION
+            SELECT move.picking_id
+              FROM stock_move move
+             WHERE move.production_id IN %(mo_ids)s
+               AND move.picking_id IS NOT NULL
+               AND move.state != 'cancel'
+             ORDER BY 1
+        """, {'names': names, 'mo_ids': tuple(self.ids)})
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _get_tree_deliveries(self):
+        """Deliveries ของ MO นี้และ MO ย่อยทั้งหมด
+
+        Results are memoized per MO tree for the current transaction.
+        :return: stock.picking recordset readable by the current user
+        """
+        self.ensure_one()
+        memo = self.env.cr.precommit.data.setdefault(MO_DELIVERIES_KEY, {})
+        if self.id not in memo:
+            tree = self.browse([self.id] + self._get_child_manufacturing_orders())
+            memo[self.id] = tree._find_delivery_ids()
+        return self.env['stock.picking'].browse(memo[self.id])._filter_access_rules('read')
+
     def action_view_related_deliveries_overview(self):
         """แสดง Deliveries Overview แบบ Hierarchical Tree View รวมทั้ง MO ย่อย"""
         self.ensure_one()
         
         # หา MO ย่อยทั้งหมด (recursive)
         child_mo_ids = self._get_child_manufacturing_orders()
-        all_mo_ids = [self.id] + child_mo_ids
-        
-        # สร้าง list ของ MO names สำหรับค้นหา origin
-        all_mo_records = self.env['mrp.production'].browse(all_mo_ids)
-        all_mo_names = all_mo_records.mapped('name')
-        
-        # วิธีที่ 1: หาจาก origin ใน stock.picking (รวม MO ย่อย)
-        deliveries_by_origin = self.env['stock.picking'].search([
-            ('origin', 'in', all_mo_names),
-            ('picking_type_id.code', '=', 'outgoing'),
-            ('state', '!=', 'cancel')
-        ])
-        
-        # วิธีที่ 2: หาจาก stock.move ที่เกี่ยวข้องกับ MO ทั้งหมด
-        moves_from_production = self.env['stock.move'].search([
-            ('production_id', 'in', all_mo_ids),
-            ('picking_id', '!=', False),
-            ('state', '!=', 'cancel')
-        ])
-        deliveries_from_moves = moves_from_production.mapped('picking_id')
-        
-        # วิธีที่ 3: หาจาก finished goods moves ของ MO ทั้งหมด
-        finished_moves = self.env['stock.move'].search([
-            ('production_id', 'in', all_mo_ids),
-            ('product_id', 'in', all_mo_records.mapped('product_id').ids),
-            ('picking_id', '!=', False),
-            ('state', '!=', 'cancel')
-        ])
-        deliveries_from_finished = finished_moves.mapped('picking_id')
-        
-        # รวมทุกวิธี
-        all_deliveries = deliveries_by_origin | deliveries_from_moves | deliveries_from_finished
-        picking_ids = all_deliveries.ids
+        all_mo_names = self.browse([self.id] + child_mo_ids).mapped('name')
+        picking_ids = self._get_tree_deliveries().ids
         
         # เปิด Dashboard เสมอ ไม่ว่าจะมี Deliveries หรือไม่
         return {
@@ -103,6 +173,55 @@ class MrpProductionMaterialOverview(models.Model):
             'res_model': 'stock.picking',
         }
 
+    @api.model
+    def get_delivery_hierarchy_data(self, delivery_ids):
+        """ข้อมูล Deliveries พร้อม moves และข้อมูลสินค้า สำหรับ delivery_hierarchy_widget ใน RPC เดียว
+
+        Pickings, moves and products are each read once in bulk.
+        :return: list of picking dicts, each with its ``moves``
+        """
+        pickings = self.env['stock.picking'].browse(delivery_ids).exists()
+        if not pickings:
+            return []
+        deliveries = pickings.read([
+            'name', 'origin', 'partner_id', 'state',
+            'scheduled_date', 'date_done', 'move_ids',
+        ])
+        moves = pickings.move_ids
+        move_rows = {
+            row['id']: row
+            for row in moves.read([
+                'product_id', 'description_picking', 'product_uom_qty',
+                'quantity', 'product_uom', 'state', 'location_id', 'location_dest_id',
+                'price_unit',
+            ])
+        }
+        product_rows = {
+            row['id']: row
+            for row in moves.product_id.read(
+                ['list_price', 'standard_price', 'default_code', 'description', 'description_sale'])
+        }
+        
+        for delivery in deliveries:
+            delivery['moves'] = []
+            for move_id in delivery['move_ids']:
+                move = move_rows.get(move_id)
+                if not move:
+                    continue
+                if move['product_id']:
+                    product = product_rows.get(move['product_id'][0])
+                    product_name = move['product_id'][1]
+                    # แยก price (ราคาขาย) และ cost (ราคาต้นทุน)
+                    move['price_unit'] = move['price_unit'] or (product and product['list_price']) or 0
+                    move['cost_unit'] = (product and product['standard_price']) or 0
+                    internal_ref = (product and product['default_code']) or ''
+                    move['product_internal_ref'] = internal_ref
+                    move['product_description'] = (product and (product['description'] or product['description_sale'])) or ''
+                    # สร้าง display name แบบ [REF] Product Name
+                    move['product_display_name'] = f"[{internal_ref}] {product_name}" if internal_ref.strip() else product_name
+                delivery['moves'].append(move)
+        return deliveries
+
     def action_debug_deliveries(self):
         """Debug method เพื่อดูข้อมูลทั้งหมดที่เกี่ยวข้องกับ MO"""
         self.ensure_one()
@@ -163,6 +282,10 @@ class MrpProductionMaterialOverview(models.Model):
     def get_mo_overview_data(self):
         """ส่งข้อมูล MO Overview แบบเดียวกับ Odoo overview"""
         self.ensure_one()
+        with self._cost_rollup_scope():
+            return self._get_mo_overview_data()
+
+    def _get_mo_overview_data(self):
         
         try:
             # Summary data
@@ -192,33 +315,35 @@ class MrpProductionMaterialOverview(models.Model):
             components = []
             
             if self.move_raw_ids:
+                # ข้อมูลที่ทุก component ต้องใช้ ดึงครั้งเดียวสำหรับทุก component
+                products = self.move_raw_ids.product_id
+                quantities = self.env['stock.quant']._get_internal_quantities(products.ids)
+                product_data = {
+                    row['id']: row
+                    for row in products.read(
+                        ['name', 'default_code', 'standard_price', 'qty_available', 'description', 'description_sale'])
+                }
+                sub_mos_by_product = self._get_sub_mos_by_component(products)
+
                 for move in self.move_raw_ids:
                     try:
                         product = move.product_id
-                        
-                        # ดึงข้อมูล stock อย่างปลอดภัย
-                        try:
-                            quants = self.env['stock.quant'].search([
-                                ('product_id', '=', product.id),
-                                ('location_id.usage', '=', 'internal')
-                            ])
-                            quantity_on_hand = sum(quants.mapped('quantity')) if quants else 0
-                        except Exception:
-                            quantity_on_hand = 0
+                        product_row = product_data[product.id]
+                        quantity_on_hand = quantities[product.id]['on_hand']
                         
                         # คำนวณต้นทุน
-                        unit_cost = getattr(product, 'standard_price', 0) or 0
+                        unit_cost = product_row['standard_price'] or 0
                         total_cost = move.product_uom_qty * unit_cost
                         
                         # สร้าง display name แบบ [REF] Product Name
-                        internal_ref = getattr(product, 'default_code', '') or ''
+                        internal_ref = product_row['default_code'] or ''
                         if internal_ref:
-                            display_name = f"[{internal_ref}] {product.name}"
+                            display_name = f"[{internal_ref}] {product_row['name']}"
                         else:
-                            display_name = product.name
+                            display_name = product_row['name']
                         
                         # หา MO ย่อยที่เกี่ยวข้องกับ component นี้
-                        sub_mos = self._get_sub_mos_for_component(product)
+                        sub_mos = sub_mos_by_product.get(product.id, [])
                         
                         component_data = {
                             'summary': {
@@ -228,14 +353,14 @@ class MrpProductionMaterialOverview(models.Model):
                                 'quantity': move.product_uom_qty,
                                 'uom_name': getattr(move.product_uom, 'name', 'Units'),
                                 'quantity_on_hand': quantity_on_hand,
-                                'quantity_free': getattr(product, 'qty_available', 0),
+                                'quantity_free': product_row['qty_available'],
                                 'quantity_reserved': getattr(move, 'reserved_availability', 0) or 0,
                                 'state': move.state,
                                 'formatted_state': self._get_move_formatted_state(move.state),
                                 'mo_cost': total_cost,
                                 'unit_cost': unit_cost,
                                 'receipt': self._get_receipt_info(move),
-                                'description': getattr(product, 'description', '') or getattr(product, 'description_sale', '') or '',
+                                'description': product_row['description'] or product_row['description_sale'] or '',
                             },
                             'sub_mos': sub_mos
                         }
@@ -388,71 +513,141 @@ class MrpProductionMaterialOverview(models.Model):
         }
         return state_map.get(state, state.title())
     
+    @contextmanager
+    def _cost_rollup_scope(self):
+        """Memoize MO cost breakdowns until the outermost scope exits.
+
+        Costs depend on moves, work orders and prices that can change at any
+        time in the transaction, so they are only shared within one report.
+        """
+        data = self.env.cr.precommit.data
+        if MO_COSTS_KEY in data:
+            yield
+            return
+        data[MO_COSTS_KEY] = {}
+        try:
+            yield
+        finally:
+            data.pop(MO_COSTS_KEY, None)
+
+    def _get_cost_rollup(self):
+        """คำนวณต้นทุนของทั้ง MO tree ครั้งเดียวแบบ bottom-up
+
+        Each MO of the trees below these MOs is costed once, children before
+        parents, and a parent adds the total of its direct sub MOs (its
+        ``child_production_ids``, as for the stored costs) in place of the
+        components they produce. Results are memoized within the
+        current ``_cost_rollup_scope``.
+        :return: dict ``{mo_id: breakdown}`` for every MO of the trees, where
+            breakdown holds planned ``materials``, ``operations``, ``sub_mos``
+            and ``total``, and the same keys prefixed with ``real_``
+        """
+        memo = self.env.cr.precommit.data.get(MO_COSTS_KEY, {})
+        # Sub MOs are the parent_production_id children, like the stored costs
+        tree = self | self._get_sub_productions()
+        # Sub MOs hidden by record rules are left out, like in the search based lookup
+        tree_ids = set(tree._filter_access_rules('read').ids) | set(self.ids)
+        missing = self.browse([mo_id for mo_id in tree_ids if mo_id not in memo])
+        if missing:
+            children_by_mo = {mo.id: mo.child_production_ids.ids for mo in missing}
+
+            def rollup(mo, visiting):
+                if mo.id in memo:
+                    return memo[mo.id]
+                visiting.add(mo.id)
+                children = mo.browse([
+                    child_id for child_id in children_by_mo.get(mo.id, [])
+                    if child_id in tree_ids and child_id not in visiting
+                ])
+                child_costs = [(child, rollup(child, visiting)) for child in children]
+                visiting.discard(mo.id)
+                memo[mo.id] = mo._compute_cost_breakdown(child_costs)
+                return memo[mo.id]
+
+            for mo in missing:
+                rollup(mo, set())
+        return {mo_id: memo[mo_id] for mo_id in tree_ids}
+
+    def _compute_cost_breakdown(self, child_costs):
+        """ต้นทุนของ MO เดียว จากต้นทุนของ MO ย่อยโดยตรงที่คำนวณไว้แล้ว
+
+        Prices are read in the company of the MO, whoever triggers the computation.
+        :param child_costs: list of ``(child_mo, breakdown)`` of the direct sub MOs
+        """
+        self = self.with_company(self.company_id)
+        # ข้ามต้นทุนของ products ที่มี Sub MOs (เพราะคำนวณใน Sub MO แทน)
+        child_product_ids = {child.product_id.id for child, costs in child_costs}
+        breakdown = dict.fromkeys([
+            'materials', 'operations', 'sub_mos', 'total',
+            'real_materials', 'real_operations', 'real_sub_mos', 'real_total',
+        ], 0)
+
+        # 1. ต้นทุนจาก raw materials (เฉพาะที่ไม่มี Sub MO)
+        for move in self.move_raw_ids:
+            if move.product_id.id in child_product_ids:
+                continue
+            unit_cost = move.product_id.standard_price or 0
+            breakdown['materials'] += (move.product_uom_qty or 0) * unit_cost
+            if move.state == 'done':
+                breakdown['real_materials'] += (move.quantity or 0) * unit_cost
+
+        # 2. ต้นทุนจาก operations/workorders (แปลงนาทีเป็นชั่วโมง)
+        for wo in self.workorder_ids:
+            cost_per_hour = wo.workcenter_id.costs_hour or 0
+            breakdown['operations'] += ((wo.duration_expected or 0) / 60) * cost_per_hour
+            if wo.state == 'done':
+                breakdown['real_operations'] += ((wo.duration or 0) / 60) * cost_per_hour
+
+        # 3. ต้นทุนจาก Sub MOs โดยตรง ซึ่งรวมต้นทุน MO ย่อยของตัวเองไว้แล้ว
+        for child, costs in child_costs:
+            breakdown['sub_mos'] += costs['total']
+            if child.state == 'done':
+                breakdown['real_sub_mos'] += costs['real_total']
+
+        breakdown['total'] = breakdown['materials'] + breakdown['operations'] + breakdown['sub_mos']
+        breakdown['real_total'] = (
+            breakdown['real_materials'] + breakdown['real_operations'] + breakdown['real_sub_mos'])
+        return breakdown
+
+    # Price changes are not a dependency: standard_price is company dependent
+    # and would rewrite every MO that ever used the product, done ones
+    # included. ProductProduct.write recomputes the open MOs instead.
+    @api.depends(
+        'move_raw_ids.product_id', 'move_raw_ids.product_uom_qty',
+        'move_raw_ids.quantity', 'move_raw_ids.state',
+        'workorder_ids.workcenter_id.costs_hour', 'workorder_ids.duration_expected',
+        'workorder_ids.duration', 'workorder_ids.state',
+        'child_production_ids.product_id', 'child_production_ids.state',
+        'child_production_ids.mo_total_cost', 'child_production_ids.mo_real_cost')
+    def _compute_mo_costs(self):
+        """Compute stored costs from the stored costs of the direct sub MOs"""
+        for production in self:
+            child_costs = [
+                (child, {'total': child.mo_total_cost, 'real_total': child.mo_real_cost})
+                for child in production.child_production_ids
+            ]
+            breakdown = production._compute_cost_breakdown(child_costs)
+            production.mo_material_cost = breakdown['materials']
+            production.mo_operation_cost = breakdown['operations']
+            production.mo_sub_mo_cost = breakdown['sub_mos']
+            production.mo_total_cost = breakdown['total']
+            production.mo_real_cost = breakdown['real_total']
+
+    @api.model
+    def _recompute_open_mo_costs(self, products):
+        """Recompute the stored costs of the open MOs of the current company using ``products``"""
+        productions = self.search([
+            ('company_id', '=', self.env.company.id),
+            ('move_raw_ids.product_id', 'in', products.ids),
+            ('state', 'not in', ['done', 'cancel']),
+        ])
+        for fname in MO_COST_FIELDS:
+            self.env.add_to_compute(self._fields[fname], productions)
+
     def _calculate_mo_cost(self):
         """คำนวณต้นทุน MO แบบครอบคลุม (แก้ไขเรื่องการคำนวณซ้ำ)"""
         try:
-            total_cost = 0
-            
-            # 1. ต้นทุนจาก raw materials (เฉพาะที่ไม่มี Sub MO)
-            material_cost = 0
-            child_mo_ids = self._get_child_manufacturing_orders()
-            child_mo_product_ids = set()
-            
-            # หา product IDs ที่มี Sub MOs เพื่อไม่ให้นับซ้ำ
-            if child_mo_ids:
-                child_mos = self.env['mrp.production'].browse(child_mo_ids)
-                child_mo_product_ids = set(child_mos.mapped('product_id.id'))
-            
-            for move in self.move_raw_ids:
-                try:
-                    # ข้ามต้นทุนของ products ที่มี Sub MOs (เพราะจะคำนวณใน Sub MO แทน)
-                    if move.product_id.id in child_mo_product_ids:
-                        _logger.debug(f"Skipping material cost for {move.product_id.name} - has Sub MO")
-                        continue
-                        
-                    unit_cost = getattr(move.product_id, 'standard_price', 0) or 0
-                    quantity = move.product_uom_qty or 0
-                    material_cost += quantity * unit_cost
-                except Exception as e:
-                    _logger.warning(f"Error calculating material cost for move {move.id}: {str(e)}")
-                    continue
-            
-            total_cost += material_cost
-            
-            # 2. ต้นทุนจาก operations/workorders
-            operation_cost = 0
-            for wo in self.workorder_ids:
-                try:
-                    duration = wo.duration_expected or 0  # ใช้เวลาที่คาดไว้
-                    cost_per_hour = getattr(wo.workcenter_id, 'costs_hour', 0) or 0
-                    # แปลงนาทีเป็นชั่วโมง
-                    operation_cost += (duration / 60) * cost_per_hour
-                except Exception as e:
-                    _logger.warning(f"Error calculating operation cost for workorder {wo.id}: {str(e)}")
-                    continue
-            
-            total_cost += operation_cost
-            
-            # 3. ต้นทุนจาก Sub MOs (ถ้ามี) - ใช้แทนต้นทุน materials ที่ข้ามไป
-            sub_mo_cost = 0
-            try:
-                if child_mo_ids:
-                    child_mos = self.env['mrp.production'].browse(child_mo_ids)
-                    for child_mo in child_mos:
-                        try:
-                            sub_mo_cost += child_mo._calculate_mo_cost()
-                        except Exception as e:
-                            _logger.warning(f"Error calculating sub MO cost for {child_mo.name}: {str(e)}")
-                            continue
-            except Exception as e:
-                _logger.warning(f"Error calculating sub MO costs: {str(e)}")
-            
-            total_cost += sub_mo_cost
-            
-            _logger.info(f"MO {self.name} cost breakdown - Materials: {material_cost}, Operations: {operation_cost}, Sub MOs: {sub_mo_cost}, Total: {total_cost}")
-            
-            return total_cost
-            
+            return self._get_cost_rollup()[self.id]['total']
         except Exception as e:
             _logger.error(f"Error calculating MO cost for {self.name}: {str(e)}")
             return 0
@@ -460,68 +655,7 @@ class MrpProductionMaterialOverview(models.Model):
     def _calculate_real_cost(self):
         """คำนวณต้นทุนจริง (จากที่ใช้ไปแล้ว) - แก้ไขเรื่องการคำนวณซ้ำ"""
         try:
-            total_real_cost = 0
-            
-            # 1. ต้นทุนจาก materials ที่ใช้จริง (เฉพาะที่ไม่มี Sub MO)
-            real_material_cost = 0
-            child_mo_ids = self._get_child_manufacturing_orders()
-            child_mo_product_ids = set()
-            
-            # หา product IDs ที่มี Sub MOs เพื่อไม่ให้นับซ้ำ
-            if child_mo_ids:
-                child_mos = self.env['mrp.production'].browse(child_mo_ids)
-                child_mo_product_ids = set(child_mos.mapped('product_id.id'))
-            
-            for move in self.move_raw_ids.filtered(lambda m: m.state == 'done'):
-                try:
-                    # ข้ามต้นทุนของ products ที่มี Sub MOs (เพราะจะคำนวณใน Sub MO แทน)
-                    if move.product_id.id in child_mo_product_ids:
-                        _logger.debug(f"Skipping real material cost for {move.product_id.name} - has Sub MO")
-                        continue
-                        
-                    unit_cost = getattr(move.product_id, 'standard_price', 0) or 0
-                    quantity_used = move.quantity or 0  # จำนวนที่ใช้จริง
-                    real_material_cost += quantity_used * unit_cost
-                except Exception as e:
-                    _logger.warning(f"Error calculating real material cost for move {move.id}: {str(e)}")
-                    continue
-            
-            total_real_cost += real_material_cost
-            
-            # 2. ต้นทุนจาก operations ที่ทำจริง
-            real_operation_cost = 0
-            for wo in self.workorder_ids.filtered(lambda w: w.state == 'done'):
-                try:
-                    duration_real = wo.duration or 0  # เวลาที่ใช้จริง
-                    cost_per_hour = getattr(wo.workcenter_id, 'costs_hour', 0) or 0
-                    # แปลงนาทีเป็นชั่วโมง
-                    real_operation_cost += (duration_real / 60) * cost_per_hour
-                except Exception as e:
-                    _logger.warning(f"Error calculating real operation cost for workorder {wo.id}: {str(e)}")
-                    continue
-                    
-            total_real_cost += real_operation_cost
-            
-            # 3. ต้นทุนจาก Sub MOs ที่เสร็จแล้ว - ใช้แทนต้นทุน materials ที่ข้ามไป
-            real_sub_mo_cost = 0
-            try:
-                if child_mo_ids:
-                    child_mos = self.env['mrp.production'].browse(child_mo_ids)
-                    for child_mo in child_mos.filtered(lambda m: m.state == 'done'):
-                        try:
-                            real_sub_mo_cost += child_mo._calculate_real_cost()
-                        except Exception as e:
-                            _logger.warning(f"Error calculating real sub MO cost for {child_mo.name}: {str(e)}")
-                            continue
-            except Exception as e:
-                _logger.warning(f"Error calculating real sub MO costs: {str(e)}")
-                
-            total_real_cost += real_sub_mo_cost
-            
-            _logger.info(f"MO {self.name} real cost breakdown - Materials: {real_material_cost}, Operations: {real_operation_cost}, Sub MOs: {real_sub_mo_cost}, Total: {total_real_cost}")
-            
-            return total_real_cost
-            
+            return self._get_cost_rollup()[self.id]['real_total']
         except Exception as e:
             _logger.error(f"Error calculating real MO cost for {self.name}: {str(e)}")
             return 0
@@ -557,16 +691,13 @@ class MrpProductionMaterialOverview(models.Model):
             if not self.bom_id:
                 return components
             
+            # ดึงข้อมูล stock ของทุก component ครั้งเดียว
+            quantities = self.env['stock.quant']._get_internal_quantities(self.bom_id.bom_line_ids.product_id.ids)
+            
             for bom_line in self.bom_id.bom_line_ids:
                 product = bom_line.product_id
                 quantity_needed = bom_line.product_qty * self.product_qty
-                
-                # ดึงข้อมูล stock
-                quants = self.env['stock.quant'].search([
-                    ('product_id', '=', product.id),
-                    ('location_id.usage', '=', 'internal')
-                ])
-                quantity_on_hand = sum(quants.mapped('quantity'))
+                quantity_on_hand = quantities[product.id]['on_hand']
                 
                 # สร้าง display name แบบ [REF] Product Name
                 internal_ref = getattr(product, 'default_code', '') or ''
@@ -709,115 +840,124 @@ class MrpProductionMaterialOverview(models.Model):
     def _get_sub_mos_for_component(self, product):
         """หา MO ย่อยที่ produce product นี้ และเกี่ยวข้องกับ MO หลักจริงๆ"""
         try:
-            # หา MO ย่อยที่เกี่ยวข้องกับ MO หลักก่อน
-            child_mo_ids = self._get_child_manufacturing_orders()
-            
-            if not child_mo_ids:
-                # ถ้าไม่มี MO ย่อย ให้ return empty list
-                _logger.info(f"No child MOs found for product {product.name} in MO {self.name}")
-                return []
-            
-            # หา Sub MOs ที่ produce product นี้ และอยู่ในรายการ child MOs
-            sub_mos = self.env['mrp.production'].search([
-                ('id', 'in', child_mo_ids),  # เฉพาะ MO ย่อยที่เกี่ยวข้อง
-                ('product_id', '=', product.id),  # ต้อง produce product นี้เท่านั้น
-                ('state', 'in', ['draft', 'confirmed', 'progress', 'to_close', 'done'])
-            ], limit=5)
-            
-            _logger.info(f"Found {len(sub_mos)} related Sub MOs for product {product.name} in MO {self.name}")
-            
-            result = []
-            for sub_mo in sub_mos:
-                # ดึงข้อมูล components ของ MO ย่อย
-                sub_components = []
-                
-                _logger.info(f"Processing Sub MO {sub_mo.name} - has {len(sub_mo.move_raw_ids)} raw moves")
-                
-                # ถ้าไม่มี raw moves ให้ลองดึงจาก BOM
-                if not sub_mo.move_raw_ids and sub_mo.bom_id:
-                    _logger.info(f"Sub MO {sub_mo.name} has no raw moves, trying BOM with {len(sub_mo.bom_id.bom_line_ids)} lines")
-                    for bom_line in sub_mo.bom_id.bom_line_ids[:10]:
-                        try:
-                            sub_product = bom_line.product_id
-                            sub_unit_cost = getattr(sub_product, 'standard_price', 0) or 0
-                            quantity_needed = bom_line.product_qty * sub_mo.product_qty
-                            sub_total_cost = quantity_needed * sub_unit_cost
-                            
-                            # สร้าง display name แบบ [REF] Product Name สำหรับ Sub MO component
-                            sub_internal_ref = getattr(sub_product, 'default_code', '') or ''
-                            if sub_internal_ref:
-                                sub_display_name = f"[{sub_internal_ref}] {sub_product.name}"
-                            else:
-                                sub_display_name = sub_product.name
-                            
-                            sub_component = {
-                                'id': f"bom_{bom_line.id}",
-                                'name': sub_display_name,
-                                'product_id': sub_product.id,
-                                'quantity': quantity_needed,
-                                'uom_name': bom_line.product_uom_id.name,
-                                'state': 'draft',
-                                'formatted_state': 'From BOM',
-                                'unit_cost': sub_unit_cost,
-                                'total_cost': sub_total_cost,
-                            }
-                            sub_components.append(sub_component)
-                            
-                        except Exception as e:
-                            _logger.warning(f"Error processing sub BOM line {bom_line.id}: {str(e)}")
-                            continue
+            return self._get_sub_mos_by_component(product)[product.id]
+        except Exception as e:
+            _logger.error(f"Error getting sub MOs for product {product.name}: {str(e)}")
+            return []
+
+    def _get_sub_mos_by_component(self, products):
+        """หา MO ย่อยของทุก component ด้วย search เดียว
+
+        :return: dict ``{product_id: [sub MO data]}``, at most 5 sub MOs per product
+        """
+        result = {product.id: [] for product in products}
+
+        # หา MO ย่อยที่เกี่ยวข้องกับ MO หลักก่อน
+        child_mo_ids = self._get_child_manufacturing_orders()
+        if not child_mo_ids:
+            _logger.info(f"No child MOs found for {len(products)} component(s) in MO {self.name}")
+            return result
+
+        # หา Sub MOs ที่ produce products เหล่านี้ และอยู่ในรายการ child MOs
+        sub_mos = self.env['mrp.production'].search([
+            ('id', 'in', child_mo_ids),  # เฉพาะ MO ย่อยที่เกี่ยวข้อง
+            ('product_id', 'in', products.ids),  # ต้อง produce products เหล่านี้เท่านั้น
+            ('state', 'in', ['draft', 'confirmed', 'progress', 'to_close', 'done'])
+        ])
+        _logger.info(f"Found {len(sub_mos)} related Sub MOs for {len(products)} component(s) in MO {self.name}")
+
+        for sub_mo in sub_mos:
+            product_sub_mos = result[sub_mo.product_id.id]
+            if len(product_sub_mos) < 5:
+                product_sub_mos.append(self._prepare_sub_mo_data(sub_mo))
+        return result
+
+    def _prepare_sub_mo_data(self, sub_mo):
+        """ข้อมูลของ MO ย่อยหนึ่งรายการ สำหรับ component table"""
+        # ดึงข้อมูล components ของ MO ย่อย
+        sub_components = []
+        
+        _logger.info(f"Processing Sub MO {sub_mo.name} - has {len(sub_mo.move_raw_ids)} raw moves")
+        
+        # ถ้าไม่มี raw moves ให้ลองดึงจาก BOM
+        if not sub_mo.move_raw_ids and sub_mo.bom_id:
+            _logger.info(f"Sub MO {sub_mo.name} has no raw moves, trying BOM with {len(sub_mo.bom_id.bom_line_ids)} lines")
+            for bom_line in sub_mo.bom_id.bom_line_ids[:10]:
+                try:
+                    sub_product = bom_line.product_id
+                    sub_unit_cost = getattr(sub_product, 'standard_price', 0) or 0
+                    quantity_needed = bom_line.product_qty * sub_mo.product_qty
+                    sub_total_cost = quantity_needed * sub_unit_cost
+                    
+                    # สร้าง display name แบบ [REF] Product Name สำหรับ Sub MO component
+                    sub_internal_ref = getattr(sub_product, 'default_code', '') or ''
+                    if sub_internal_ref:
+                        sub_display_name = f"[{sub_internal_ref}] {sub_product.name}"
+                    else:
+                        sub_display_name = sub_product.name
+                    
+                    sub_component = {
+                        'id': f"bom_{bom_line.id}",
+                        'name': sub_display_name,
+                        'product_id': sub_product.id,
+                        'quantity': quantity_needed,
+                        'uom_name': bom_line.product_uom_id.name,
+                        'state': 'draft',
+                        'formatted_state': 'From BOM',
+                        'unit_cost': sub_unit_cost,
+                        'total_cost': sub_total_cost,
+                    }
+                    sub_components.append(sub_component)
+                    
+                except Exception as e:
+                    _logger.warning(f"Error processing sub BOM line {bom_line.id}: {str(e)}")
+                    continue
+        
+        # ดึงจาก raw moves (วิธีเดิม)
+        for sub_move in sub_mo.move_raw_ids[:10]:  # จำกัดไม่เกิน 10 components
+            try:
+                sub_product = sub_move.product_id
+                sub_unit_cost = getattr(sub_product, 'standard_price', 0) or 0
+                sub_total_cost = sub_move.product_uom_qty * sub_unit_cost
                 
-                # ดึงจาก raw moves (วิธีเดิม)
-                for sub_move in sub_mo.move_raw_ids[:10]:  # จำกัดไม่เกิน 10 components
-                    try:
-                        sub_product = sub_move.product_id
-                        sub_unit_cost = getattr(sub_product, 'standard_price', 0) or 0
-                        sub_total_cost = sub_move.product_uom_qty * sub_unit_cost
-                        
-                        # สร้าง display name แบบ [REF] Product Name สำหรับ Sub MO component
-                        sub_internal_ref = getattr(sub_product, 'default_code', '') or ''
-                        if sub_internal_ref:
-                            sub_display_name = f"[{sub_internal_ref}] {sub_product.name}"
-                        else:
-                            sub_display_name = sub_product.name
-                        
-                        sub_component = {
-                            'id': sub_move.id,
-                            'name': sub_display_name,
-                            'product_id': sub_product.id,
-                            'quantity': sub_move.product_uom_qty,
-                            'uom_name': getattr(sub_move.product_uom, 'name', 'Units'),
-                            'state': sub_move.state,
-                            'formatted_state': self._get_move_formatted_state(sub_move.state),
-                            'unit_cost': sub_unit_cost,
-                            'total_cost': sub_total_cost,
-                        }
-                        sub_components.append(sub_component)
-                        
-                    except Exception as e:
-                        _logger.warning(f"Error processing sub component {sub_move.id}: {str(e)}")
-                        continue
+                # สร้าง display name แบบ [REF] Product Name สำหรับ Sub MO component
+                sub_internal_ref = getattr(sub_product, 'default_code', '') or ''
+                if sub_internal_ref:
+                    sub_display_name = f"[{sub_internal_ref}] {sub_product.name}"
+                else:
+                    sub_display_name = sub_product.name
                 
-                sub_mo_data = {
-                    'id': sub_mo.id,
-                    'name': sub_mo.name,
-                    'product_name': sub_mo.product_id.name,
-                    'quantity': sub_mo.product_qty,
-                    'uom_name': sub_mo.product_uom_id.name,
-                    'state': sub_mo.state,
-                    'formatted_state': self._get_formatted_state_for_mo(sub_mo.state),
-                    'components': sub_components,
-                    'total_cost': sub_mo._calculate_mo_cost()  # ใช้ต้นทุนจริงจาก _calculate_mo_cost()
+                sub_component = {
+                    'id': sub_move.id,
+                    'name': sub_display_name,
+                    'product_id': sub_product.id,
+                    'quantity': sub_move.product_uom_qty,
+                    'uom_name': getattr(sub_move.product_uom, 'name', 'Units'),
+                    'state': sub_move.state,
+                    'formatted_state': self._get_move_formatted_state(sub_move.state),
+                    'unit_cost': sub_unit_cost,
+                    'total_cost': sub_total_cost,
                 }
-                result.append(sub_mo_data)
+                sub_components.append(sub_component)
                 
-                _logger.info(f"Sub MO {sub_mo.name} added with {len(sub_components)} components")
-            
-            return result
-            
-        except Exception as e:
-            _logger.error(f"Error getting sub MOs for product {product.name}: {str(e)}")
-            return []
+            except Exception as e:
+                _logger.warning(f"Error processing sub component {sub_move.id}: {str(e)}")
+                continue
+        
+        sub_mo_data = {
+            'id': sub_mo.id,
+            'name': sub_mo.name,
+            'product_name': sub_mo.product_id.name,
+            'quantity': sub_mo.product_qty,
+            'uom_name': sub_mo.product_uom_id.name,
+            'state': sub_mo.state,
+            'formatted_state': self._get_formatted_state_for_mo(sub_mo.state),
+            'components': sub_components,
+            'total_cost': sub_mo._calculate_mo_cost()  # ใช้ต้นทุนจริงจาก _calculate_mo_cost()
+        }
+        
+        _logger.info(f"Sub MO {sub_mo.name} added with {len(sub_components)} components")
+        return sub_mo_data
     
     def _get_formatted_state_for_mo(self, state):
         """แปลง MO state เป็น text ที่อ่านง่าย"""
@@ -831,19 +971,38 @@ class MrpProductionMaterialOverview(models.Model):
         }
         return state_map.get(state, state.title())
 
-    def action_export_mo_overview_excel(self):
-        """Export MO Overview เป็น Excel file"""
-        self.ensure_one()
-        
-        try:
-            import xlsxwriter
-            import base64
-            from io import BytesIO
-            from datetime import datetime
-            
-            # สร้าง workbook
-            output = BytesIO()
-            workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    def _unlink_mo_overview_exports(self):
+        """ลบไฟล์ Excel ที่ export ไว้ก่อนหน้าของ MO นี้"""
+        self.env['ir.attachment'].search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('name', '=like', MO_OVERVIEW_EXPORT_PREFIX + '%'),
+            ('mimetype', '=', XLSX_MIMETYPE),
+        ]).unlink()
+
+    def _unlink_mo_batch_exports(self):
+        """ลบไฟล์ Excel ต้นทุนหลาย MO ที่ผู้ใช้คนนี้ export ไว้ก่อนหน้า"""
+        self.env['ir.attachment'].search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', False),
+            ('name', '=like', MO_COST_BATCH_EXPORT_PREFIX + '%'),
+            ('mimetype', '=', XLSX_MIMETYPE),
+            ('create_uid', '=', self.env.uid),
+        ]).unlink()
+
+    @api.model
+    def _write_xlsx_attachment(self, filename, write_sheets, res_model, res_id):
+        """เขียน workbook ลง temp file แล้วเก็บเป็น attachment
+
+        The workbook is written row by row in xlsxwriter constant_memory mode
+        and stored in the filestore through ``raw``, without base64.
+        :param write_sheets: callable ``(workbook, header_format)`` adding the sheets
+        """
+        import xlsxwriter
+        import tempfile
+
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as output:
+            workbook = xlsxwriter.Workbook(output.name, {'constant_memory': True})
             
             # สร้าง formats แบบคลีนๆ
             header_format = workbook.add_format({
@@ -851,61 +1010,236 @@ class MrpProductionMaterialOverview(models.Model):
                 'bg_color': '#E7E6E6',
                 'border': 1
             })
+            write_sheets(workbook, header_format)
             
-            # ดึงข้อมูล
-            overview_data = self.get_mo_overview_data()
-            
+            workbook.close()
+            output.seek(0)
+            content = output.read()
+
+        return self.env['ir.attachment'].create({
+            'name': filename,
+            'type': 'binary',
+            'raw': content,
+            'res_model': res_model,
+            'res_id': res_id,
+            'mimetype': XLSX_MIMETYPE,
+        })
+
+    @api.model
+    def _get_export_download_action(self, attachment):
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/mrp/mo_overview/export/{attachment.id}',
+            'target': 'new',
+        }
+
+    @api.model
+    def _get_export_notification(self, title, message, notification_type):
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': title,
+                'message': message,
+                'type': notification_type,
+            }
+        }
+
+    def _write_mo_overview_export(self, res_model, res_id):
+        """สร้างไฟล์ Excel MO Overview ของ MO นี้
+
+        :return: ir.attachment of the workbook, linked to ``res_model``/``res_id``
+        """
+        self.ensure_one()
+        from datetime import datetime
+        
+        # ดึงข้อมูล
+        overview_data = self.get_mo_overview_data()
+        
+        def write_sheets(workbook, header_format):
             # Sheet 1: MO Cost Summary (รวมทุกอย่าง)
             self._create_mo_cost_summary_sheet(workbook, overview_data, header_format)
             
             # Sheet 2: Labor & Operations Details
             self._create_labor_operations_sheet(workbook, overview_data, header_format)
-            
-            workbook.close()
-            output.seek(0)
-            
-            # สร้าง attachment
-            filename = f"MO_Overview_{self.name.replace('/', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            attachment = self.env['ir.attachment'].create({
-                'name': filename,
-                'type': 'binary',
-                'datas': base64.b64encode(output.read()),
-                'res_model': self._name,
-                'res_id': self.id,
-                'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            })
-            
-            return {
-                'type': 'ir.actions.act_url',
-                'url': f'/web/content/{attachment.id}?download=true',
-                'target': 'new',
-            }
+        
+        filename = f"{MO_OVERVIEW_EXPORT_PREFIX}{self.name.replace('/', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        return self._write_xlsx_attachment(filename, write_sheets, res_model, res_id)
+
+    def action_export_mo_overview_excel(self):
+        """Export MO Overview เป็น Excel file
+
+        MOs with more than MO_OVERVIEW_SYNC_SUB_MO_LIMIT sub MOs are exported
+        in the background by an mrp.dashboard.job.
+        """
+        self.ensure_one()
+        
+        if len(self._get_mo_descendant_depths()[self.id]) > MO_OVERVIEW_SYNC_SUB_MO_LIMIT:
+            self.env['mrp.dashboard.job']._enqueue('mo_overview', self, f"MO Overview {self.name}")
+            return self._get_export_notification(
+                'Export Queued',
+                f'MO {self.name} มี MO ย่อยจำนวนมาก กำลังสร้างไฟล์ Excel เบื้องหลัง ระบบจะแจ้งเตือนเมื่อเสร็จ',
+                'info')
+        
+        try:
+            # ลบ export เก่า แล้วเก็บไฟล์ใหม่ลง filestore
+            self._unlink_mo_overview_exports()
+            attachment = self._write_mo_overview_export(self._name, self.id)
+            return self._get_export_download_action(attachment)
             
         except ImportError:
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': 'Missing Library',
-                    'message': 'กรุณาติดตั้ง xlsxwriter library: pip install xlsxwriter',
-                    'type': 'warning',
-                }
-            }
+            return self._get_export_notification(
+                'Missing Library', 'กรุณาติดตั้ง xlsxwriter library: pip install xlsxwriter', 'warning')
         except Exception as e:
             _logger.error(f"Error exporting Excel: {str(e)}")
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': 'Export Error',
-                    'message': f'เกิดข้อผิดพลาดในการ export: {str(e)}',
-                    'type': 'error',
-                }
-            }
+            return self._get_export_notification(
+                'Export Error', f'เกิดข้อผิดพลาดในการ export: {str(e)}', 'error')
 
-    def _create_mo_cost_summary_sheet(self, workbook, overview_data, header_format):
+    def action_export_mo_overview_excel_batch(self):
+        """Export ต้นทุนของ MO ที่เลือกทั้งหมดเป็น Excel ไฟล์เดียว
+
+        Selections of more than MO_EXPORT_BATCH_SYNC_LIMIT MOs are built in
+        the background by an mrp.dashboard.job.
+        """
+        if not self:
+            return True
+        if len(self) > MO_EXPORT_BATCH_SYNC_LIMIT:
+            self.env['mrp.dashboard.job']._enqueue('mo_cost_batch', self, f"MO Cost Export ({len(self)} MOs)")
+            return self._get_export_notification(
+                'Export Queued',
+                f'กำลังสร้างไฟล์ Excel ของ {len(self)} MO เบื้องหลัง ระบบจะแจ้งเตือนเมื่อเสร็จ',
+                'info')
+        
+        try:
+            self._unlink_mo_batch_exports()
+            attachment = self._write_mo_batch_export(self._name, False)
+            return self._get_export_download_action(attachment)
+            
+        except ImportError:
+            return self._get_export_notification(
+                'Missing Library', 'กรุณาติดตั้ง xlsxwriter library: pip install xlsxwriter', 'warning')
+        except Exception as e:
+            _logger.error(f"Error exporting batch Excel: {str(e)}")
+            return self._get_export_notification(
+                'Export Error', f'เกิดข้อผิดพลาดในการ export: {str(e)}', 'error')
+
+    def _write_mo_batch_export(self, res_model, res_id, progress_callback=None):
+        """สร้างไฟล์ Excel ต้นทุนของหลาย MO: สรุป 1 แถวต่อ MO และ sheet รายละเอียดของแต่ละ MO
+
+        The MO trees, costs and stock of the whole selection are loaded once
+        up front, then each overview is written and dropped before the next.
+        :param progress_callback: optional callable ``(done, total)`` called after each MO
+        :return: ir.attachment of the workbook, linked to ``res_model``/``res_id``
+        """
+        from datetime import datetime
+
+        def write_sheets(workbook, header_format):
+            summary_sheet = self._start_batch_cost_summary_sheet(workbook, header_format)
+            money_format = workbook.add_format({'num_format': '#,##0.00'})
+            sheet_names = {BATCH_SUMMARY_SHEET_NAME.lower()}
+            totals = {}
+            row = 1
+            for index, mo in enumerate(self, 1):
+                overview_data = mo.get_mo_overview_data()
+                costs = self._write_batch_cost_summary_row(summary_sheet, row, overview_data, money_format)
+                for key, amount in costs.items():
+                    totals[key] = totals.get(key, 0) + amount
+                row += 1
+                self._create_mo_cost_summary_sheet(
+                    workbook, overview_data, header_format,
+                    sheet_name=self._get_unique_sheet_name(mo.name, sheet_names))
+                if progress_callback and (index % 10 == 0 or index == len(self)):
+                    progress_callback(index, len(self))
+            # Total row
+            summary_sheet.write(row, 0, 'TOTAL', header_format)
+            for col in range(1, BATCH_COST_FIRST_COLUMN):
+                summary_sheet.write(row, col, '', header_format)
+            for offset, key in enumerate(BATCH_COST_KEYS):
+                summary_sheet.write_number(row, BATCH_COST_FIRST_COLUMN + offset, totals.get(key, 0), header_format)
+
+        filename = f"{MO_COST_BATCH_EXPORT_PREFIX}{len(self)}_MOs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        with self._cost_rollup_scope():
+            self._get_cost_rollup()
+            self.env['stock.quant']._get_internal_quantities(self.move_raw_ids.product_id.ids)
+            return self._write_xlsx_attachment(filename, write_sheets, res_model, res_id)
+
+    def _write_bom_materials_report(self, res_model, res_id):
+        """พิมพ์รายงาน BOM Materials ของ MO ที่เลือกเป็น PDF แล้วเก็บเป็น attachment"""
+        from datetime import datetime
+        
+        report = self.env.ref('need_mrp_dashboard.action_report_mrp_bom_materials')
+        content, _content_type = self.env['ir.actions.report']._render_qweb_pdf(report, self.ids)
+        return self.env['ir.attachment'].create({
+            'name': f"BOM_Materials_{len(self)}_MOs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+            'type': 'binary',
+            'raw': content,
+            'res_model': res_model,
+            'res_id': res_id,
+            'mimetype': 'application/pdf',
+        })
+
+    def action_enqueue_bom_materials_report(self):
+        """สั่งพิมพ์รายงาน BOM Materials เบื้องหลัง สำหรับ MO tree ขนาดใหญ่"""
+        if not self:
+            return True
+        self.env['mrp.dashboard.job']._enqueue('bom_report', self, f"BOM Materials ({len(self)} MOs)")
+        return self._get_export_notification(
+            'Report Queued',
+            f'กำลังสร้างรายงาน BOM Materials ของ {len(self)} MO เบื้องหลัง ระบบจะแจ้งเตือนเมื่อเสร็จ',
+            'info')
+
+    @api.model
+    def _start_batch_cost_summary_sheet(self, workbook, header_format):
+        """สร้าง Sheet สรุปต้นทุน 1 แถวต่อ MO พร้อมหัวตาราง"""
+        worksheet = workbook.add_worksheet(BATCH_SUMMARY_SHEET_NAME)
+        headers = [
+            ('MO Name', 20), ('Product', 35), ('Quantity', 12), ('UoM', 10),
+            ('State', 15), ('Customer', 25),
+            ('Material Cost', 15), ('Labor Cost', 15), ('Sub MO Labor Cost', 18),
+            ('Shipping Cost', 15), ('Sub MO Shipping Cost', 20), ('Total Cost', 15), ('Unit Cost', 15),
+        ]
+        for col, (label, width) in enumerate(headers):
+            worksheet.set_column(col, col, width)
+            worksheet.write(0, col, label, header_format)
+        return worksheet
+
+    @api.model
+    def _write_batch_cost_summary_row(self, worksheet, row, overview_data, money_format):
+        """เขียนแถวสรุปต้นทุนของ MO หนึ่งตัว
+
+        :return: dict of the written amounts keyed by BATCH_COST_KEYS
+        """
+        summary = overview_data.get('summary', {})
+        cost_summary = overview_data.get('cost_summary', {})
+        quantity = summary.get('quantity') or 0
+        costs = {key: cost_summary.get(key, 0) for key in BATCH_COST_KEYS if key != 'unit_cost'}
+        costs['unit_cost'] = costs['total_cost'] / quantity if quantity else 0
+        
+        worksheet.write(row, 0, summary.get('mo_name', ''))
+        worksheet.write(row, 1, summary.get('name', ''))
+        worksheet.write_number(row, 2, quantity)
+        worksheet.write(row, 3, summary.get('uom_name', ''))
+        worksheet.write(row, 4, summary.get('formatted_state', ''))
+        worksheet.write(row, 5, summary.get('customer_name', ''))
+        for offset, key in enumerate(BATCH_COST_KEYS):
+            worksheet.write_number(row, BATCH_COST_FIRST_COLUMN + offset, costs[key], money_format)
+        return costs
+
+    @api.model
+    def _get_unique_sheet_name(self, name, used_names):
+        """ชื่อ sheet ที่ Excel รับได้ (ไม่เกิน 31 ตัว ไม่มีอักขระต้องห้าม) และไม่ซ้ำกับ ``used_names``"""
+        base = re.sub(r'[\[\]:*?/\\]', '_', name or 'MO')[:31]
+        sheet_name, index = base, 1
+        while sheet_name.lower() in used_names:
+            index += 1
+            suffix = f"~{index}"
+            sheet_name = base[:31 - len(suffix)] + suffix
+        used_names.add(sheet_name.lower())
+        return sheet_name
+
+    def _create_mo_cost_summary_sheet(self, workbook, overview_data, header_format, sheet_name='MO Cost Summary'):
         """สร้าง Sheet 1: MO Cost Summary - รวมทุกข้อมูลสำคัญ"""
-        worksheet = workbook.add_worksheet('MO Cost Summary')
+        worksheet = workbook.add_worksheet(sheet_name)
         
         # Set column widths
         worksheet.set_column('A:A', 25)  # Label
@@ -1219,40 +1553,8 @@ class MrpProductionMaterialOverview(models.Model):
         try:
             # หา MO ย่อยทั้งหมด (recursive)
             child_mo_ids = self._get_child_manufacturing_orders()
-            all_mo_ids = [self.id] + child_mo_ids
-            
-            # สร้าง list ของ MO names สำหรับค้นหา origin
-            all_mo_records = self.env['mrp.production'].browse(all_mo_ids)
-            all_mo_names = all_mo_records.mapped('name')
-            
-            _logger.info(f"Searching deliveries for MOs: {all_mo_names}")
-            
-            # วิธีที่ 1: หาจาก origin ใน stock.picking (รวม MO ย่อย)
-            deliveries_by_origin = self.env['stock.picking'].search([
-                ('origin', 'in', all_mo_names),
-                ('picking_type_id.code', '=', 'outgoing'),
-                ('state', '!=', 'cancel')
-            ])
-            
-            # วิธีที่ 2: หาจาก stock.move ที่เกี่ยวข้องกับ MO ทั้งหมด
-            moves_from_production = self.env['stock.move'].search([
-                ('production_id', 'in', all_mo_ids),
-                ('picking_id', '!=', False),
-                ('state', '!=', 'cancel')
-            ])
-            deliveries_from_moves = moves_from_production.mapped('picking_id')
-            
-            # วิธีที่ 3: หาจาก finished goods moves ของ MO ทั้งหมด
-            finished_moves = self.env['stock.move'].search([
-                ('production_id', 'in', all_mo_ids),
-                ('product_id', 'in', all_mo_records.mapped('product_id').ids),
-                ('picking_id', '!=', False),
-                ('state', '!=', 'cancel')
-            ])
-            deliveries_from_finished = finished_moves.mapped('picking_id')
-            
-            # รวมทุกวิธี
-            all_deliveries = deliveries_by_origin | deliveries_from_moves | deliveries_from_finished
+            all_mo_names = self.browse([self.id] + child_mo_ids).mapped('name')
+            all_deliveries = self._get_tree_deliveries()
             
             _logger.info(f"Found {len(all_deliveries)} deliveries for export")
             
@@ -1317,4 +1619,15 @@ class MrpProductionMaterialOverview(models.Model):
             worksheet.write(row, 1, operation['workcenter'])
             worksheet.write(row, 2, operation['duration_expected'])
             worksheet.write(row, 3, operation['state'])
-            row += 1 
\ No newline at end of file
+            row += 1 
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    def write(self, vals):
+        """Recompute the stored costs of open MOs when the cost price changes"""
+        result = super(ProductProduct, self).write(vals)
+        if 'standard_price' in vals:
+            self.env['mrp.production'].sudo()._recompute_open_mo_costs(self)
+        return result
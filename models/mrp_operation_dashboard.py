@@ -44,50 +44,93 @@ class MrpOperationDashboard(models.Model):
                 'color': 7
             })
 
+    def _get_mo_domain(self):
+        """Base domain of the Manufacturing Orders counted by this card"""
+        return [('picking_type_id', '=', self.operation_type_id.id)]
+
+    def _get_mo_filter(self):
+        """Return ``(domain, where)`` selecting the card's Manufacturing Orders"""
+        return self._get_mo_domain(), None
+
+    def _get_mo_kpis(self, now):
+        """Counter conditions for Manufacturing Orders, stored in the KPI snapshot"""
+        return {
+            'count_ready': [
+                ('state', 'in', ['confirmed', 'planned']),
+                ('reservation_state', '=', 'assigned'),
+            ],
+            'count_waiting': [
+                ('state', 'in', ['confirmed', 'planned']),
+                ('reservation_state', '=', 'waiting'),
+            ],
+            'count_late': [
+                ('state', 'in', ['confirmed', 'planned', 'progress']),
+                ('date_start', '<', now),
+            ],
+            'count_in_progress': [
+                ('state', '=', 'progress'),
+            ],
+        }
+
+    @api.model
+    def _get_picking_kpis(self, now):
+        """Counter conditions for Stock Pickings, keyed by card field"""
+        return {
+            'count_todo': [
+                ('state', '=', 'assigned'),
+            ],
+            'count_waiting': [
+                ('state', 'in', ['confirmed', 'waiting']),
+            ],
+            'count_late': [
+                ('state', 'not in', ['done', 'cancel']),
+                ('scheduled_date', '<', now),
+            ],
+            'count_in_progress': [
+                ('state', '=', 'assigned'),
+            ],
+        }
+
     @api.depends('operation_type_id')
     def _compute_operation_count(self):
-        for record in self:
-            if not record.operation_type_id:
-                record.count_todo = 0
-                record.count_waiting = 0
-                record.count_late = 0
-                record.count_in_progress = 0
-                continue
+        """Compute all cards with one query per target model.
 
+        Manufacturing Orders are read from the KPI snapshot, Stock Pickings are
+        counted with one query grouped by picking type.
+        """
+        mrp_cards = self.filtered(lambda r: r.operation_type_id.code == 'mrp_operation')
+        snapshot_counts = self.env['mrp.dashboard.kpi.snapshot']._read_cards(mrp_cards) if mrp_cards else {}
+        picking_types = (self - mrp_cards).operation_type_id
+        picking_counts = {}
+        if picking_types:
+            picking_counts = self.env['mrp.dashboard.kpi.mixin']._read_kpi_counts(
+                'stock.picking',
+                [('picking_type_id', 'in', picking_types.ids)],
+                self._get_picking_kpis(fields.Datetime.now()),
+                groupby='picking_type_id',
+            )
+        for record in self:
             if record.operation_type_id.code == 'mrp_operation':
-                # Manufacturing Orders
-                base_domain = [('picking_type_id', '=', record.operation_type_id.id)]
-                record.count_todo = self.env['mrp.production'].search_count(base_domain + [
-                    ('state', 'in', ['confirmed', 'planned']),
-                    ('reservation_state', '=', 'assigned')
-                ])
-                record.count_waiting = self.env['mrp.production'].search_count(base_domain + [
-                    ('state', 'in', ['confirmed', 'planned']),
-                    ('reservation_state', '=', 'waiting')
-                ])
-                record.count_late = self.env['mrp.production'].search_count(base_domain + [
-                    ('state', 'in', ['confirmed', 'planned', 'progress']),
-                    ('date_start', '<', fields.Datetime.now())
-                ])
-                record.count_in_progress = self.env['mrp.production'].search_count(base_domain + [
-                    ('state', '=', 'progress')
-                ])
+                # Manufacturing Orders, read from the KPI snapshot
+                card_counts = snapshot_counts.get(record._origin.id, {})
+                record.count_todo = card_counts.get('count_ready', 0)
+                record.count_waiting = card_counts.get('count_waiting', 0)
+                record.count_late = card_counts.get('count_late', 0)
+                record.count_in_progress = card_counts.get('count_in_progress', 0)
             else:
                 # Stock Pickings
-                base_domain = [('picking_type_id', '=', record.operation_type_id.id)]
-                record.count_todo = self.env['stock.picking'].search_count(base_domain + [
-                    ('state', 'in', ['assigned']),
-                ])
-                record.count_waiting = self.env['stock.picking'].search_count(base_domain + [
-                    ('state', 'in', ['confirmed', 'waiting']),
-                ])
-                record.count_late = self.env['stock.picking'].search_count(base_domain + [
-                    ('state', 'not in', ['done', 'cancel']),
-                    ('scheduled_date', '<', fields.Datetime.now())
-                ])
-                record.count_in_progress = self.env['stock.picking'].search_count(base_domain + [
-                    ('state', '=', 'assigned')
-                ])
+                card_counts = picking_counts.get(record.operation_type_id.id, {})
+                record.count_todo = card_counts.get('count_todo', 0)
+                record.count_waiting = card_counts.get('count_waiting', 0)
+                record.count_late = card_counts.get('count_late', 0)
+                record.count_in_progress = card_counts.get('count_in_progress', 0)
+
+    def write(self, vals):
+        """Override write to drop the KPI snapshot when the operation type changes"""
+        result = super(MrpOperationDashboard, self).write(vals)
+        if 'operation_type_id' in vals:
+            self.env['mrp.dashboard.kpi.snapshot'].sudo().search([('operation_dashboard_id', 'in', self.ids)]).unlink()
+        return result
 
     def get_operation_action(self):
         self.ensure_one()
@@ -3,6 +3,12 @@ import logging
 
 _logger = logging.getLogger(__name__)
 
+# Fields whose change can move a MO between dashboard KPI counters
+KPI_SNAPSHOT_FIELDS = {'state', 'reservation_state', 'date_start', 'picking_type_id'}
+
+# Fields copied from a parent MO to its sub MOs when they are empty there
+SUB_MO_PROPAGATED_FIELDS = ['technician_team', 'customer_name', 'sales_team', 'shipping_cost']
+
 class MrpLaborTransaction(models.Model):
     _name = 'mrp.labor.transaction'
     _description = 'MRP Labor Cost Transaction'
@@ -58,6 +64,8 @@ class MrpLaborTransaction(models.Model):
 
 class MrpProduction(models.Model):
     _inherit = 'mrp.production'
+    _parent_name = 'parent_production_id'
+    _parent_store = True
 
     # Field for tracking BOM Materials Report printing
     bom_materials_printed = fields.Boolean(
@@ -113,6 +121,22 @@ class MrpProduction(models.Model):
         help='ค่าแรงรวมจากการเบิกทั้งหมด'
     )
 
+    # Sub-MO hierarchy, a whole tree is fetched with one parent_path query
+    parent_production_id = fields.Many2one(
+        'mrp.production',
+        string='Parent MO',
+        index=True,
+        copy=False,
+        ondelete='set null',
+        help='MO whose component this sub MO produces'
+    )
+    child_production_ids = fields.One2many(
+        'mrp.production',
+        'parent_production_id',
+        string='Sub MOs'
+    )
+    parent_path = fields.Char(index=True, unaccent=False)
+
     @api.depends('bom_materials_printed')
     def _compute_bom_materials_print_status(self):
         """Compute print status indicator for list view"""
@@ -180,84 +204,144 @@ class MrpProduction(models.Model):
         
         return None
 
+    def _get_sub_productions(self):
+        """All sub MOs below these MOs, at any depth, with one indexed query"""
+        return self.search([('id', 'child_of', self.ids), ('id', 'not in', self.ids)])
+
+    @api.model
+    def _backfill_parent_production(self):
+        """Link existing sub MOs to the MO named in their origin.
+
+        Only MOs created before the sub MO qualify, which also rules out
+        cycles. The parent_path of every MO is recomputed afterwards.
+        """
+        self.flush_model(['parent_production_id', 'origin'])
+        self.env.cr.execute("""
+            UPDATE mrp_production child
+               SET parent_production_id = parent.id
+              FROM mrp_production parent
+             WHERE child.parent_production_id IS NULL
+               AND child.origin = parent.name
+               AND child.company_id = parent.company_id
+               AND parent.id < child.id
+        """)
+        _logger.info(f"Linked {self.env.cr.rowcount} sub MOs to their parent MO")
+        self.invalidate_model(['parent_production_id', 'parent_path'])
+        self._parent_store_compute()
+
+    def _mark_kpi_snapshot_stale(self):
+        """Flag the dashboard KPI snapshot partitions of these MOs for recount"""
+        self.env['mrp.dashboard.kpi.snapshot']._mark_stale(set(self.picking_type_id.ids))
+
+    def _mark_chart_days_dirty(self):
+        """Flag the chart days these MOs are counted on for recount"""
+        day_companies = {
+            (fields.Date.to_date(mo.create_date), mo.company_id.id)
+            for mo in self if mo.create_date
+        }
+        self.env['custom.mo.dashboard']._mark_days_dirty(day_companies)
+
+    def _compute_state(self):
+        """Override to refresh dashboard KPIs and charts when the state is recomputed"""
+        result = super(MrpProduction, self)._compute_state()
+        self._mark_kpi_snapshot_stale()
+        self._mark_chart_days_dirty()
+        return result
+
+    def _compute_reservation_state(self):
+        """Override to refresh dashboard KPIs when the reservation state is recomputed"""
+        result = super(MrpProduction, self)._compute_reservation_state()
+        self._mark_kpi_snapshot_stale()
+        return result
+
     @api.model
     def create(self, vals):
         """Override create to copy fields from parent MO to sub MO"""
         # Create the MO first
         result = super(MrpProduction, self).create(vals)
+        result._invalidate_mo_descendants()
+        result._mark_kpi_snapshot_stale()
+        result._mark_chart_days_dirty()
         
         # Try to find parent MO and copy fields
         parent_mo = result._find_parent_mo()
         
         if parent_mo:
-            # Copy additional fields from parent MO
-            update_vals = {}
-            if parent_mo.technician_team and not result.technician_team:
-                update_vals['technician_team'] = parent_mo.technician_team
-            if parent_mo.customer_name and not result.customer_name:
-                update_vals['customer_name'] = parent_mo.customer_name
-            if parent_mo.sales_team and not result.sales_team:
-                update_vals['sales_team'] = parent_mo.sales_team
-            if parent_mo.shipping_cost and not result.shipping_cost:
-                update_vals['shipping_cost'] = parent_mo.shipping_cost
+            # Link the sub MO and copy additional fields from parent MO
+            update_vals = {'parent_production_id': parent_mo.id}
+            update_vals.update(parent_mo._get_sub_mo_propagation_vals(result))
             
             # Update the sub MO with parent's fields
-            if update_vals:
-                result.write(update_vals)
-                _logger.info(f"Sub MO {result.name} copied fields from parent MO {parent_mo.name}: {update_vals}")
+            result.write(update_vals)
+            _logger.info(f"Sub MO {result.name} copied fields from parent MO {parent_mo.name}: {update_vals}")
         
         return result
 
+    def _get_sub_mo_propagation_vals(self, sub_mo, pending_vals=None):
+        """Values of this parent MO to copy to ``sub_mo``, for the fields the sub MO leaves empty"""
+        pending_vals = pending_vals or {}
+        return {
+            fname: self[fname]
+            for fname in SUB_MO_PROPAGATED_FIELDS
+            if self[fname] and not sub_mo[fname] and fname not in pending_vals
+        }
+
+    def _propagate_fields_to_sub_mos(self):
+        """Copy team, customer and shipping fields of these MOs to all their sub MOs.
+
+        Each sub MO takes the values of its nearest parent in ``self`` first.
+        Sub MOs needing identical values are written together, with one
+        ``write`` per distinct set of values.
+        :return: dict with the ``parent_count``, ``sub_mo_count``,
+            ``updated_count`` and ``write_count`` of the run
+        """
+        parents = self.filtered(lambda mo: mo.name and mo.name != '/')
+        # Every selected parent sharing a sub MO, nearest first
+        parents_by_sub_mo = {}
+        for parent_id, descendant_depths in parents._get_mo_descendant_depths().items():
+            for sub_mo_id, depth in descendant_depths.items():
+                parents_by_sub_mo.setdefault(sub_mo_id, []).append((depth, parent_id))
+        # Keep the record rules of the former search based lookup
+        sub_mos = self.browse(list(parents_by_sub_mo))._filter_access_rules('read')
+
+        groups = {}
+        for sub_mo in sub_mos:
+            update_vals = {}
+            for _depth, parent_id in sorted(parents_by_sub_mo[sub_mo.id]):
+                update_vals.update(self.browse(parent_id)._get_sub_mo_propagation_vals(sub_mo, update_vals))
+            if update_vals:
+                key = tuple(sorted(update_vals.items()))
+                groups[key] = groups.get(key, self.browse()) | sub_mo
+
+        for key, group_sub_mos in groups.items():
+            group_sub_mos.write(dict(key))
+
+        counts = {
+            'parent_count': len(parents),
+            'sub_mo_count': len(sub_mos),
+            'updated_count': sum(len(group_sub_mos) for group_sub_mos in groups.values()),
+            'write_count': len(groups),
+        }
+        _logger.info(
+            "Propagated parent fields of %(parent_count)s MOs: %(updated_count)s of "
+            "%(sub_mo_count)s sub MOs updated in %(write_count)s writes", counts)
+        return counts
+
     def action_update_sub_mo_fields(self):
-        """Manual action to update fields in sub MOs"""
-        child_mo_ids = []
-        
-        # Find all sub MOs using the existing method from mrp_material_overview
-        if hasattr(self, '_get_child_manufacturing_orders'):
-            child_mo_ids = self._get_child_manufacturing_orders()
-        else:
-            # Fallback: search by origin
-            child_mos = self.env['mrp.production'].search([
-                ('origin', '=', self.name),
-                ('id', '!=', self.id)
-            ])
-            child_mo_ids = child_mos.ids
+        """Manual action to update fields in the sub MOs of the selected MOs"""
+        counts = self._propagate_fields_to_sub_mos()
         
-        if child_mo_ids:
-            child_mos = self.env['mrp.production'].browse(child_mo_ids)
-            updated_count = 0
-            
-            for child_mo in child_mos:
-                update_vals = {}
-                
-                # Copy technician_team if parent has it and child doesn't
-                if self.technician_team and not child_mo.technician_team:
-                    update_vals['technician_team'] = self.technician_team
-                
-                # Copy customer_name if parent has it and child doesn't
-                if self.customer_name and not child_mo.customer_name:
-                    update_vals['customer_name'] = self.customer_name
-                
-                # Copy sales_team if parent has it and child doesn't
-                if self.sales_team and not child_mo.sales_team:
-                    update_vals['sales_team'] = self.sales_team
-                
-                # Copy shipping_cost if parent has it and child doesn't
-                if self.shipping_cost and not child_mo.shipping_cost:
-                    update_vals['shipping_cost'] = self.shipping_cost
-                
-                if update_vals:
-                    child_mo.write(update_vals)
-                    updated_count += 1
-                    _logger.info(f"Updated sub MO {child_mo.name} with fields: {update_vals}")
-            
+        if counts['sub_mo_count']:
             # Show notification to user
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
                 'params': {
                     'title': 'Sub MO Fields Updated',
-                    'message': f'Updated {updated_count} sub MO(s) with team info, customer name, and costs.',
+                    'message': (
+                        f"Updated {counts['updated_count']} of {counts['sub_mo_count']} sub MO(s) "
+                        f"of {counts['parent_count']} MO(s) with team info, customer name, and costs."
+                    ),
                     'type': 'success',
                     'sticky': False,
                 }
@@ -268,7 +352,7 @@ class MrpProduction(models.Model):
                 'tag': 'display_notification',
                 'params': {
                     'title': 'No Sub MOs Found',
-                    'message': 'No sub manufacturing orders found for this MO.',
+                    'message': 'No sub manufacturing orders found for the selected MO(s).',
                     'type': 'info',
                     'sticky': False,
                 }
@@ -403,7 +487,17 @@ class MrpProduction(models.Model):
 
     def write(self, vals):
         """Override write to auto-close when state changes to to_close"""
+        kpi_changed = bool(KPI_SNAPSHOT_FIELDS & set(vals))
+        if kpi_changed:
+            # Old picking types lose the MO, new ones gain it
+            self._mark_kpi_snapshot_stale()
         result = super(MrpProduction, self).write(vals)
+        if kpi_changed:
+            self._mark_kpi_snapshot_stale()
+        if 'state' in vals:
+            self._mark_chart_days_dirty()
+        if {'name', 'origin', 'parent_production_id'} & set(vals):
+            self._invalidate_mo_descendants()
         
         # Check if we should auto-close to_close orders
         if 'state' in vals and vals['state'] == 'to_close':
@@ -423,6 +517,12 @@ class MrpProduction(models.Model):
         
         return result
 
+    def unlink(self):
+        """Override unlink to drop the memoized MO trees holding the deleted MOs"""
+        result = super(MrpProduction, self).unlink()
+        self._invalidate_mo_descendants()
+        return result
+
 
 class MrpWorkorder(models.Model):
     _inherit = 'mrp.workorder'
@@ -12,23 +12,35 @@ class MrpWorkorderDashboard(models.Model):
     count_workorders = fields.Integer(compute='_compute_workorder_count', string='Work Orders')
     duration_expected = fields.Float(compute='_compute_workorder_count', string='Expected Duration')
 
-    def _get_workorder_domain(self):
+    @api.model
+    def _get_open_workorder_domain(self):
         return [
             '|', ('state', '=', 'progress'),
             '|', ('state', '=', 'ready'),
             '|', ('state', '=', 'waiting'),
             '&', ('state', '=', 'pending'),
-            ('production_state', '!=', 'draft'),
-            ('workcenter_id', '=', self.workcenter_id.id)
+            ('production_state', '!=', 'draft')
         ]
 
+    def _get_workorder_domain(self):
+        return self._get_open_workorder_domain() + [('workcenter_id', '=', self.workcenter_id.id)]
+
     @api.depends('workcenter_id')
     def _compute_workorder_count(self):
+        """Compute all cards with one query grouped by work center"""
+        workcenters = self.workcenter_id
+        results = {}
+        if workcenters:
+            groups = self.env['mrp.workorder']._read_group(
+                self._get_open_workorder_domain() + [('workcenter_id', 'in', workcenters.ids)],
+                groupby=['workcenter_id'],
+                aggregates=['__count', 'duration_expected:sum'],
+            )
+            results = {workcenter.id: (count, duration) for workcenter, count, duration in groups}
         for record in self:
-            domain = record._get_workorder_domain()
-            workorders = self.env['mrp.workorder'].search(domain)
-            record.count_workorders = len(workorders)
-            record.duration_expected = sum(workorders.mapped('duration_expected'))
+            count, duration = results.get(record.workcenter_id.id, (0, 0.0))
+            record.count_workorders = count
+            record.duration_expected = duration
 
     def get_workorder_action(self):
         self.ensure_one()
@@ -43,13 +55,7 @@ class MrpWorkorderDashboard(models.Model):
     @api.model
     def get_workorder_graph_data(self):
         WorkOrder = self.env['mrp.workorder']
-        domain = [
-            '|', ('state', '=', 'progress'),
-            '|', ('state', '=', 'ready'),
-            '|', ('state', '=', 'waiting'),
-            '&', ('state', '=', 'pending'),
-            ('production_state', '!=', 'draft')
-        ]
+        domain = self._get_open_workorder_domain()
         
         result = WorkOrder.read_group(
             domain=domain,
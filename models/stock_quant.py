@@ -0,0 +1,73 @@
+from odoo import models, api
+
+# Key of the per-transaction memo of internal quantities in cr.precommit.data
+INTERNAL_QUANTITIES_KEY = 'need_mrp_dashboard.internal_quantities'
+
+
+class StockQuant(models.Model):
+    _inherit = 'stock.quant'
+
+    @api.model
+    def _get_internal_quantities(self, product_ids):
+        """Return on-hand, reserved and free quantities in internal locations.
+
+        All products missing from the memo are read with one grouped query,
+        and the result is memoized for the current transaction, so the MO
+        overview and the Excel export share it. The memo is dropped on every
+        quant change, including the quantity updates done by stock moves.
+        :param product_ids: iterable of product.product ids
+        :return: dict ``{product_id: {'on_hand': float, 'reserved': float, 'free': float}}``
+        """
+        memo = self.env.cr.precommit.data.setdefault(INTERNAL_QUANTITIES_KEY, {}).setdefault(
+            tuple(self.env.companies.ids), {})
+        product_ids = set(product_ids)
+        missing_ids = [product_id for product_id in product_ids if product_id not in memo]
+        if missing_ids:
+            groups = self._read_group(
+                [('product_id', 'in', missing_ids), ('location_id.usage', '=', 'internal')],
+                groupby=['product_id'],
+                aggregates=['quantity:sum', 'reserved_quantity:sum'],
+            )
+            for product_id in missing_ids:
+                memo[product_id] = {'on_hand': 0.0, 'reserved': 0.0, 'free': 0.0}
+            for product, on_hand, reserved in groups:
+                memo[product.id] = {'on_hand': on_hand, 'reserved': reserved, 'free': on_hand - reserved}
+        return {product_id: memo[product_id] for product_id in product_ids}
+
+    @api.model
+    def _invalidate_internal_quantities(self):
+        self.env.cr.precommit.data.pop(INTERNAL_QUANTITIES_KEY, None)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Override create to drop the memoized internal quantities"""
+        self._invalidate_internal_quantities()
+        return super(StockQuant, self).create(vals_list)
+
+    def write(self, vals):
+        """Override write to drop the memoized internal quantities"""
+        self._invalidate_internal_quantities()
+        return super(StockQuant, self).write(vals)
+
+    def unlink(self):
+        """Override unlink to drop the memoized internal quantities"""
+        self._invalidate_internal_quantities()
+        return super(StockQuant, self).unlink()
+
+    @api.model
+    def _update_available_quantity(self, *args, **kwargs):
+        """Override to drop the memoized internal quantities when a move changes stock"""
+        self._invalidate_internal_quantities()
+        return super(StockQuant, self)._update_available_quantity(*args, **kwargs)
+
+    @api.model
+    def _update_reserved_quantity(self, *args, **kwargs):
+        """Override to drop the memoized internal quantities when a move reserves stock"""
+        self._invalidate_internal_quantities()
+        return super(StockQuant, self)._update_reserved_quantity(*args, **kwargs)
+
+    @api.model
+    def _merge_quants(self):
+        """Override to drop the memoized internal quantities, quants are merged in SQL"""
+        self._invalidate_internal_quantities()
+        return super(StockQuant, self)._merge_quants()
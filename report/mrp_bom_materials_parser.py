@@ -10,18 +10,23 @@ class BomMaterialsReportParser(models.AbstractModel):
     @api.model
     def _get_report_values(self, docids, data=None):
         """Override to track report printing"""
+        cr = self.env.cr
+        query_count = cr.sql_log_count
         
         # Get the manufacturing orders
         docs = self.env['mrp.production'].browse(docids)
         
         # Mark all selected MOs as having BOM Materials Report printed
-        for mo in docs:
-            mo.mark_bom_materials_printed()
-            _logger.info(f"Marked BOM Materials Report as printed for MO: {mo.name}")
+        docs.mark_bom_materials_printed()
         
         # Get materials data (existing logic from your current report)
-        materials = self._get_materials_data(docs)
+        stats = self._new_report_stats()
+        materials = self._get_materials_data(docs, stats)
         
+        _logger.info(
+            "BOM Materials report printed for %s MO(s): %s BOM lines, %s sub-components, %s materials, %s queries",
+            len(docs), stats['bom_lines'], stats['sub_components'], len(materials), cr.sql_log_count - query_count,
+        )
         return {
             'doc_ids': docids,
             'doc_model': 'mrp.production',
@@ -29,9 +34,50 @@ class BomMaterialsReportParser(models.AbstractModel):
             'materials': materials,
         }
     
-    def _get_materials_data(self, docs):
-        """Get materials data for the report (existing logic)"""
+    def _new_report_stats(self):
+        """Counters of one report run, logged as one summary line.
+
+        Per-node tracing only runs when the ``bom_report_trace`` context key
+        is set and this logger is at DEBUG level.
+        """
+        return {
+            'bom_lines': 0,
+            'sub_components': 0,
+            'trace': bool(self.env.context.get('bom_report_trace')) and _logger.isEnabledFor(logging.DEBUG),
+        }
+    
+    def _preload_reserved_quantities(self, docs):
+        """Reserved quantity of every raw material of ``docs``, with one grouped query.
+
+        :return: dict ``{(mo_id, product_id): quantity}`` over the assigned
+            and partially available raw moves
+        """
+        groups = self.env['stock.move']._read_group(
+            [
+                ('raw_material_production_id', 'in', docs.ids),
+                ('state', 'in', ['assigned', 'partially_available']),
+            ],
+            groupby=['raw_material_production_id', 'product_id'],
+            aggregates=['quantity:sum'],
+        )
+        return {(mo.id, product.id): quantity for mo, product, quantity in groups}
+    
+    def _get_materials_data(self, docs, stats=None):
+        """Get materials data for the report (existing logic)
+
+        :param stats: counters of the report run, see _new_report_stats
+        """
+        stats = self._new_report_stats() if stats is None else stats
         materials = {}
+        # BOM explosions shared by all MOs of this report run
+        bom_memo = {}
+        Explosion = self.env['mrp.bom.explosion']
+        for company in docs.company_id:
+            # Resolve every BOM of the report level by level up front
+            company_docs = docs.filtered(lambda mo: mo.company_id == company)
+            Explosion._prefetch_boms(company_docs.bom_id.bom_line_ids.product_id, company, bom_memo)
+        # Reserved quantities of every MO, loaded once instead of per BOM line
+        reserved_quantities = self._preload_reserved_quantities(docs)
         
         for mo in docs:
             if not mo.bom_id:
@@ -39,6 +85,7 @@ class BomMaterialsReportParser(models.AbstractModel):
                 
             # Process BOM components
             for line in mo.bom_id.bom_line_ids:
+                stats['bom_lines'] += 1
                 product = line.product_id
                 key = product.id
                 
@@ -57,50 +104,47 @@ class BomMaterialsReportParser(models.AbstractModel):
                 materials[key]['qty'] += qty_needed
                 
                 # Get reserved quantity from stock moves - using correct field for Odoo 17
-                reserved_qty = sum(
-                    move.quantity for move in mo.move_raw_ids
-                    if move.product_id.id == product.id and move.state in ('assigned', 'partially_available')
-                )
+                reserved_qty = reserved_quantities.get((mo.id, product.id), 0.0)
                 materials[key]['reserved_qty'] += reserved_qty
+                if stats['trace']:
+                    _logger.debug("MO %s: %s %s of %s needed, %s reserved",
+                                  mo.name, qty_needed, line.product_uom_id.name, product.display_name, reserved_qty)
                 
                 # Process sub-components if any
-                self._process_subcomponents(product, qty_needed, materials, [key])
+                self._process_subcomponents(
+                    product, qty_needed, line.product_uom_id, mo.company_id, materials, [key], bom_memo, stats)
         
         return materials
     
-    def _process_subcomponents(self, product, parent_qty, materials, parent_ids):
-        """Process sub-components recursively"""
-        # Find BOM for this product
-        bom = self.env['mrp.bom'].search([
-            ('product_id', '=', product.id),
-            ('type', '=', 'normal')
-        ], limit=1)
-        
-        if not bom:
-            return
-            
-        for line in bom.bom_line_ids:
-            subproduct = line.product_id
+    def _process_subcomponents(self, product, parent_qty, parent_uom, company, materials, parent_ids, bom_memo=None, stats=None):
+        """Add every sub-component of ``parent_qty`` of ``product`` using the shared BOM explosion engine
+
+        :param stats: counters of the report run, see _new_report_stats
+        """
+        stats = self._new_report_stats() if stats is None else stats
+        entries = self.env['mrp.bom.explosion']._explode(product, parent_qty, parent_uom, company, memo=bom_memo)
+        stats['sub_components'] += len(entries)
+        for subproduct, sub_qty, sub_uom, path in entries:
             key = subproduct.id
+            sub_parent_ids = parent_ids + list(path)
+            if stats['trace']:
+                _logger.debug("%s%s %s of %s (sub-component of %s)",
+                              '  ' * len(sub_parent_ids), sub_qty, sub_uom.name, subproduct.display_name, sub_parent_ids)
             
             if key not in materials:
                 materials[key] = {
                     'product': subproduct,
                     'qty': 0.0,
                     'reserved_qty': 0.0,
-                    'uom': line.product_uom_id,
+                    'uom': sub_uom,
                     'is_subcomponent': True,
-                    'parents': parent_ids.copy(),
+                    'parents': sub_parent_ids,
                 }
             else:
                 # Add parent to existing entry
-                for parent_id in parent_ids:
+                for parent_id in sub_parent_ids:
                     if parent_id not in materials[key]['parents']:
                         materials[key]['parents'].append(parent_id)
             
             # Calculate sub-component quantity
-            sub_qty = (line.product_qty / bom.product_qty) * parent_qty
             materials[key]['qty'] += sub_qty
-            
-            # Recursively process sub-sub-components
-            self._process_subcomponents(subproduct, sub_qty, materials, parent_ids + [key]) 
\ No newline at end of file
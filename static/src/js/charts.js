@@ -34,6 +34,7 @@ export class ChartsDashboard extends Component {
         this.state = useState({
             startDate: this.formatDateForAPI(firstDayOfMonth),
             endDate: this.formatDateForAPI(today),
+            granularity: 'day',
             recentMOs: [],
             operationTypes: [],
             selectedOperationType: '',
@@ -221,31 +222,21 @@ export class ChartsDashboard extends Component {
     async loadAndRenderChart() {
         try {
             console.log('Loading dashboard data...');
-            // Generate data first
-            await this.orm.call(
+            // One call returns the whole range in columnar form; past days
+            // that are already rolled up are only read on the server
+            const series = await this.orm.call(
                 "custom.mo.dashboard",
-                "generate_data",
-                [this.state.startDate, this.state.endDate]
-            );
-            
-            // Then fetch all records
-            const records = await this.orm.searchRead(
-                "custom.mo.dashboard",
-                [
-                    ['date', '>=', this.state.startDate],
-                    ['date', '<=', this.state.endDate]
-                ],
-                ["date", "draft", "confirmed", "progress", "done", "cancel"],
-                { order: "date asc" }
+                "get_chart_series",
+                [this.state.startDate, this.state.endDate, this.state.granularity]
             );
             
             // Process data for chart
-            this.state.chartData.labels = records.map(r => r.date);
-            this.state.chartData.datasets[0].data = records.map(r => r.draft);
-            this.state.chartData.datasets[1].data = records.map(r => r.confirmed);
-            this.state.chartData.datasets[2].data = records.map(r => r.progress);
-            this.state.chartData.datasets[3].data = records.map(r => r.done);
-            this.state.chartData.datasets[4].data = records.map(r => r.cancel);
+            this.state.chartData.labels = series.labels;
+            this.state.chartData.datasets[0].data = series.draft;
+            this.state.chartData.datasets[1].data = series.confirmed;
+            this.state.chartData.datasets[2].data = series.progress;
+            this.state.chartData.datasets[3].data = series.done;
+            this.state.chartData.datasets[4].data = series.cancel;
             
             console.log('Data received:', this.state.chartData);
             this.renderChart();
@@ -48,74 +48,13 @@ export class DeliveryHierarchyWidget extends Component {
             
             // console.log("Searching for deliveries with IDs:", deliveryIds);
             
-            // โหลดข้อมูล deliveries พร้อม moves
-            const deliveries = await this.orm.searchRead(
-                "stock.picking",
-                [["id", "in", deliveryIds]],
-                [
-                    "name", "origin", "partner_id", "state", 
-                    "scheduled_date", "date_done", "move_ids"
-                ]
+            // โหลดข้อมูล deliveries พร้อม moves และข้อมูลสินค้า ใน RPC เดียว
+            const deliveries = await this.orm.call(
+                "mrp.production",
+                "get_delivery_hierarchy_data",
+                [deliveryIds]
             );
             
-            // console.log("Found deliveries:", deliveries);
-            
-            // โหลดข้อมูล moves สำหรับแต่ละ delivery
-            for (const delivery of deliveries) {
-                if (delivery.move_ids && delivery.move_ids.length > 0) {
-                    console.log(`Loading moves for delivery ${delivery.name}:`, delivery.move_ids);
-                    delivery.moves = await this.orm.searchRead(
-                        "stock.move",
-                        [["id", "in", delivery.move_ids]],
-                        [
-                            "product_id", "description_picking", "product_uom_qty",
-                            "quantity", "product_uom", "state", "location_id", "location_dest_id",
-                            "price_unit"
-                        ]
-                    );
-                    
-                    // ถ้า move ไม่มี price_unit ให้ดึงจาก product พร้อม internal reference
-                    for (const move of delivery.moves) {
-                        if (move.product_id) {
-                            try {
-                                const product = await this.orm.searchRead(
-                                    "product.product",
-                                    [["id", "=", move.product_id[0]]],
-                                    ["list_price", "standard_price", "default_code", "description", "description_sale"]
-                                );
-                                if (product.length > 0) {
-                                    const productData = product[0];
-                                    // แยก price และ cost
-                                    move.price_unit = move.price_unit || productData.list_price || 0; // ราคาขาย
-                                    move.cost_unit = productData.standard_price || 0; // ราคาต้นทุน
-                                    move.product_internal_ref = productData.default_code || '';
-                                    move.product_description = productData.description || productData.description_sale || '';
-                                    // สร้าง display name
-                                    move.product_display_name = this.formatProductName(move.product_id[1], productData.default_code);
-                                } else {
-                                    move.price_unit = move.price_unit || 0;
-                                    move.cost_unit = 0;
-                                    move.product_internal_ref = '';
-                                    move.product_description = '';
-                                    move.product_display_name = move.product_id[1];
-                                }
-                            } catch (error) {
-                                console.error(`Error loading product data for ${move.product_id[1]}:`, error);
-                                move.price_unit = move.price_unit || 0;
-                                move.cost_unit = 0;
-                                move.product_internal_ref = '';
-                                move.product_description = '';
-                                move.product_display_name = move.product_id[1];
-                            }
-                        }
-                    }
-                    
-                    // console.log(`Moves for ${delivery.name}:`, delivery.moves);
-                } else {
-                    delivery.moves = [];
-                }
-            }
-            
             this.state.deliveries = deliveries;
             this.state.loading = false;
             
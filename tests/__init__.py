@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+from . import test_mo_chart_rollup
+from . import test_mrp_dashboard_kpi
+from . import test_mrp_workorder_dashboard
+from . import test_mrp_material_overview
+from . import test_mrp_bom_explosion
+from . import test_bom_materials_report
+from . import test_mo_overview_export
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import TransactionCase
+
+# Prefix of the per-transaction memos this module keeps in cr.precommit.data
+MEMO_KEY_PREFIX = 'need_mrp_dashboard.'
+
+
+class MrpDashboardQueryCase(TransactionCase):
+    """Query-count tests compare a small fixture with a large one.
+
+    The expected count is measured on the small fixture, so the tests check
+    that the count stays flat as the data grows, whatever modules are
+    installed next to this one.
+    """
+
+    def _reset_caches(self):
+        """Start from cold caches and memos, like a new request would"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        for key in [key for key in self.env.cr.precommit.data if key.startswith(MEMO_KEY_PREFIX)]:
+            del self.env.cr.precommit.data[key]
+
+    def _count_queries(self, func):
+        """Number of queries run by ``func`` from cold caches, flush included"""
+        self._reset_caches()
+        count = self.env.cr.sql_log_count
+        func()
+        self.env.flush_all()
+        return self.env.cr.sql_log_count - count
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import Command
+from odoo.tests import TransactionCase, tagged
+
+PARSER_LOGGER = 'odoo.addons.need_mrp_dashboard.report.mrp_bom_materials_parser'
+
+
+@tagged('post_install', '-at_install')
+class TestBomMaterialsReport(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Product = cls.env['product.product']
+        leaf = Product.create({'name': 'Report Leaf', 'type': 'consu'})
+        sub = Product.create({'name': 'Report Sub-Assembly', 'type': 'consu'})
+        finished = Product.create({'name': 'Report Finished Product', 'type': 'consu'})
+        cls.env['mrp.bom'].create({
+            'product_tmpl_id': sub.product_tmpl_id.id,
+            'product_qty': 1.0,
+            'bom_line_ids': [Command.create({'product_id': leaf.id, 'product_qty': 2.0})],
+        })
+        bom = cls.env['mrp.bom'].create({
+            'product_tmpl_id': finished.product_tmpl_id.id,
+            'product_qty': 1.0,
+            'bom_line_ids': [Command.create({'product_id': sub.id, 'product_qty': 3.0})],
+        })
+        cls.production = cls.env['mrp.production'].create({
+            'product_id': finished.id,
+            'product_qty': 1.0,
+            'bom_id': bom.id,
+        })
+
+    def _render(self, **context):
+        Parser = self.env['report.need_mrp_dashboard.report_mrp_bom_materials'].with_context(**context)
+        return Parser._get_report_values(self.production.ids)
+
+    def test_summary_line_without_trace(self):
+        """One INFO summary line per run, no per-node trace unless asked for"""
+        with self.assertLogs(PARSER_LOGGER, logging.DEBUG) as logs:
+            values = self._render()
+        self.assertEqual([record.levelno for record in logs.records], [logging.INFO])
+        self.assertIn('1 BOM lines, 1 sub-components, 2 materials', logs.output[0])
+        self.assertTrue(self.production.bom_materials_printed)
+        self.assertEqual(len(values['materials']), 2)
+
+    def test_trace_opt_in(self):
+        """The bom_report_trace context key logs each node at DEBUG level"""
+        with self.assertLogs(PARSER_LOGGER, logging.DEBUG) as logs:
+            self._render(bom_report_trace=True)
+        levels = [record.levelno for record in logs.records]
+        self.assertEqual(levels.count(logging.DEBUG), 2)
+        self.assertEqual(levels.count(logging.INFO), 1)
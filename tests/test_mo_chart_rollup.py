@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from datetime import date, timedelta
+
+from odoo import api, fields, SUPERUSER_ID
+from odoo.tests import tagged
+
+from .common import MrpDashboardQueryCase
+
+
+@tagged('post_install', '-at_install')
+class TestMoChartRollup(MrpDashboardQueryCase):
+
+    def test_generate_data_counts_states(self):
+        """A rolled up day holds the MO count of each state"""
+        Chart = self.env['custom.mo.dashboard']
+        company = self.env.company
+        product = self.env['product.product'].create({'name': 'Chart Finished Product', 'type': 'consu'})
+        self.env['mrp.production'].create([{'product_id': product.id, 'product_qty': 1.0}] * 2)
+        self.env.flush_all()
+        today = fields.Datetime.now().date()
+        # Recount today whatever was rolled up before this test
+        Chart.search([('company_id', '=', company.id), ('date', '=', today)]).unlink()
+
+        series = Chart.get_chart_series(today, today)
+        Production = self.env['mrp.production']
+        for state in ('draft', 'confirmed', 'done'):
+            expected = Production.search_count([
+                ('company_id', '=', company.id),
+                ('create_date', '>=', today),
+                ('create_date', '<', today + timedelta(days=1)),
+                ('state', '=', state),
+            ])
+            self.assertEqual(series[state], [expected], state)
+        self.assertGreaterEqual(series['draft'][0], 2)
+
+    def test_generate_data_query_count_flat(self):
+        """Counting a quarter costs the same queries as counting a week"""
+        Chart = self.env['custom.mo.dashboard']
+        # Warm up the registry caches
+        Chart.generate_data(date(2002, 1, 1), date(2002, 1, 7))
+
+        expected = self._count_queries(lambda: Chart.generate_data(date(2003, 1, 1), date(2003, 1, 7)))
+        self._reset_caches()
+        with self.assertQueryCount(expected):
+            day_counts = Chart.generate_data(date(2004, 1, 1), date(2004, 3, 31))
+        self.assertEqual(len(day_counts), 91)
+
+    def test_generate_data_read_only(self):
+        """Chart loads count outdated days live and leave the rollup to the cron"""
+        Chart = self.env['custom.mo.dashboard']
+        domain = [
+            ('company_id', '=', self.env.company.id),
+            ('date', '>=', date(2005, 1, 1)),
+            ('date', '<=', date(2005, 1, 7)),
+        ]
+        self.assertEqual(len(Chart.generate_data(date(2005, 1, 1), date(2005, 1, 7))), 7)
+        # Run the precommit hooks that queue the never counted days
+        self.env.cr.flush()
+        self.assertEqual(Chart.search_count(domain), 0)
+        self.assertEqual(self.env['custom.mo.dashboard.dirty'].search_count(domain), 7)
+
+        # A second load before the cron ran queues nothing more
+        Chart.generate_data(date(2005, 1, 1), date(2005, 1, 7))
+        self.env.cr.flush()
+        self.assertEqual(self.env['custom.mo.dashboard.dirty'].search_count(domain), 7)
+
+        Chart._cron_rollup_dirty_days()
+        self.assertEqual(Chart.search_count(domain), 7)
+        self.assertEqual(self.env['custom.mo.dashboard.dirty'].search_count(domain), 0)
+        self.assertEqual(Chart.generate_data(date(2005, 1, 1), date(2005, 1, 7)), {})
+
+    def test_concurrent_rollup_days(self):
+        """Concurrent rollups of the same days wait on the lock and write one row per day"""
+        days = {date(2001, 1, 1) + timedelta(days=index) for index in range(7)}
+        company_id = self.env.company.id
+        writer_count = 4
+
+        def cleanup():
+            with self.registry.cursor() as cr:
+                cr.execute(
+                    "DELETE FROM custom_mo_dashboard WHERE company_id = %s AND date BETWEEN %s AND %s",
+                    [company_id, min(days), max(days)])
+        cleanup()
+        self.addCleanup(cleanup)
+
+        # Every writer takes its snapshot before any of them can write
+        snapshots_taken = threading.Barrier(writer_count + 1)
+        errors = []
+
+        def writer():
+            try:
+                with self.registry.cursor() as cr:
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    env['custom.mo.dashboard'].search_count([])
+                    snapshots_taken.wait(timeout=60)
+                    env['custom.mo.dashboard']._rollup_days(days, env['res.company'].browse(company_id))
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+
+        with self.registry.cursor() as lock_cr:
+            lock_cr.execute("SELECT pg_advisory_xact_lock(hashtext(%s), %s)", ['custom_mo_dashboard', company_id])
+            threads = [threading.Thread(target=writer) for _index in range(writer_count)]
+            for thread in threads:
+                thread.start()
+            snapshots_taken.wait(timeout=60)
+
+            # pg_locks is not transactional: it shows the writers queued on the lock
+            deadline = time.monotonic() + 60
+            waiting = 0
+            while waiting < writer_count:
+                self.assertLess(time.monotonic(), deadline, "The writers should wait for the rollup lock")
+                lock_cr.execute("""
+                    SELECT count(*) FROM pg_locks
+                     WHERE locktype = 'advisory' AND objsubid = 2 AND objid = %s AND NOT granted
+                """, [company_id])
+                waiting = lock_cr.fetchone()[0]
+                time.sleep(0.01)
+            lock_cr.rollback()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        with self.registry.cursor() as cr:
+            cr.execute("""
+                SELECT date, count(*) FROM custom_mo_dashboard
+                 WHERE company_id = %s AND date BETWEEN %s AND %s
+                 GROUP BY date
+            """, [company_id, min(days), max(days)])
+            self.assertEqual(dict(cr.fetchall()), dict.fromkeys(days, 1))
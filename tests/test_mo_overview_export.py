@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import HttpCase, new_test_user, tagged
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+@tagged('post_install', '-at_install')
+class TestMoOverviewExport(HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.owner = new_test_user(cls.env, login='export_owner', groups='mrp.group_mrp_user')
+        cls.other_user = new_test_user(cls.env, login='export_other', groups='mrp.group_mrp_user')
+        cls.outsider = new_test_user(cls.env, login='export_outsider', groups='base.group_user')
+        product = cls.env['product.product'].create({'name': 'Export Finished Product', 'type': 'consu'})
+        cls.production = cls.env['mrp.production'].create({'product_id': product.id, 'product_qty': 1.0})
+
+    def _create_export(self, res_model, res_id, user):
+        return self.env['ir.attachment'].with_user(user).create({
+            'name': 'MO_Overview_Export.xlsx',
+            'type': 'binary',
+            'raw': b'export',
+            'res_model': res_model,
+            'res_id': res_id,
+            'mimetype': XLSX_MIMETYPE,
+        })
+
+    def _download(self, attachment, user):
+        self.authenticate(user.login, user.login)
+        return self.url_open(f'/mrp/mo_overview/export/{attachment.id}')
+
+    def test_owner_downloads_export(self):
+        """The user who exported a MO downloads the workbook"""
+        attachment = self._create_export('mrp.production', self.production.id, self.owner)
+        response = self._download(attachment, self.owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'export')
+
+    def test_other_user_cannot_download_batch_export(self):
+        """An export linked to no MO is only served to the user who made it"""
+        attachment = self._create_export('mrp.production', False, self.owner)
+        self.assertEqual(self._download(attachment, self.other_user).status_code, 404)
+
+    def test_user_without_mo_access_cannot_download_export(self):
+        """A MO export is not served to users who may not read the MO"""
+        attachment = self._create_export('mrp.production', self.production.id, self.owner)
+        self.assertEqual(self._download(attachment, self.outsider).status_code, 404)
+
+    def test_other_attachments_not_served(self):
+        """Attachments of other models are not served by the export route"""
+        attachment = self._create_export('res.partner', self.owner.partner_id.id, self.env.user)
+        self.assertEqual(self._download(attachment, self.owner).status_code, 404)
+
+    def test_other_user_cannot_download_job_result(self):
+        """A background job result is only served to users who may read the job"""
+        job = self.env['mrp.dashboard.job'].with_user(self.owner).create({
+            'name': 'MO Cost Batch',
+            'job_type': 'mo_cost_batch',
+            'production_ids': [(6, 0, self.production.ids)],
+        })
+        attachment = self._create_export('mrp.dashboard.job', job.id, self.owner)
+        self.assertEqual(self._download(attachment, self.owner).status_code, 200)
+        self.assertEqual(self._download(attachment, self.other_user).status_code, 404)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from odoo import Command
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestMrpBomExplosion(TransactionCase):
+
+    def _create_product(self, name):
+        return self.env['product.product'].create({'name': name, 'type': 'consu'})
+
+    def _create_bom(self, product, lines, product_qty=1.0):
+        return self.env['mrp.bom'].create({
+            'product_tmpl_id': product.product_tmpl_id.id,
+            'product_id': product.id,
+            'product_qty': product_qty,
+            'bom_line_ids': [
+                Command.create({'product_id': component.id, 'product_qty': qty}) for component, qty in lines
+            ],
+        })
+
+    def _create_tree(self, width, depth, prefix):
+        """Chain of ``depth`` sub-assemblies below a top product.
+
+        The BOM of each level lists the sub-assembly of the next level
+        ``width`` times, so the sub-assembly of level n occurs ``width ** n``
+        times in the tree while the number of products stays ``depth + 1``.
+        """
+        top = self._create_product(f'{prefix} Top')
+        product = top
+        for depth_index in range(depth):
+            component = self._create_product(f'{prefix} L{depth_index}')
+            self._create_bom(product, [(component, 1.0)] * width)
+            product = component
+        return top
+
+    def _explode(self, product, quantity=1.0, memo=None):
+        company = self.env.company
+        return self.env['mrp.bom.explosion']._explode(product, quantity, product.uom_id, company, memo=memo)
+
+    def _count_queries(self, func):
+        """Number of queries run by ``func`` from cold caches, flush included"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        count = self.env.cr.sql_log_count
+        func()
+        self.env.flush_all()
+        return self.env.cr.sql_log_count - count
+
+    def test_shared_sub_assembly_quantities(self):
+        """A sub-assembly used at several places is scaled for each occurrence"""
+        top = self._create_product('Top')
+        sub = self._create_product('Sub-Assembly')
+        leaf = self._create_product('Leaf')
+        self._create_bom(sub, [(leaf, 3.0)], product_qty=2.0)
+        self._create_bom(top, [(sub, 4.0), (leaf, 1.0)])
+
+        entries = self._explode(top, 2.0)
+        quantities = {}
+        for component, qty, _uom, path in entries:
+            quantities[component.id, path] = quantities.get((component.id, path), 0.0) + qty
+        self.assertEqual(quantities, {
+            (sub.id, ()): 8.0,
+            # 8 sub-assemblies from a BOM of 3 leaves per 2 units
+            (leaf.id, (sub.id,)): 12.0,
+            (leaf.id, ()): 2.0,
+        })
+
+    def test_cycle_does_not_prune_other_paths(self):
+        """A subtree cut short by a cycle on one path is exploded fully on another"""
+        top = self._create_product('Top')
+        first = self._create_product('First')
+        second = self._create_product('Second')
+        leaf = self._create_product('Leaf')
+        # first -> second -> first is a cycle, second -> leaf is not
+        self._create_bom(first, [(second, 1.0)])
+        self._create_bom(second, [(first, 1.0), (leaf, 1.0)])
+        self._create_bom(top, [(first, 1.0), (second, 1.0)])
+
+        with self.assertLogs('odoo.addons.need_mrp_dashboard.models.mrp_bom_explosion', 'WARNING'):
+            entries = self._explode(top)
+        paths = sorted((component.id, path) for component, _qty, _uom, path in entries)
+        self.assertEqual(paths, sorted([
+            (first.id, ()),
+            (second.id, (first.id,)),
+            (leaf.id, (first.id, second.id)),
+            (second.id, ()),
+            (first.id, (second.id,)),
+            (leaf.id, (second.id,)),
+        ]))
+
+    def test_query_count_flat_with_width(self):
+        """Exploding a wide BOM tree costs the queries of a narrow one of the same depth"""
+        narrow_top = self._create_tree(2, 3, 'Narrow')
+        wide_top = self._create_tree(20, 3, 'Wide')
+        # Warm up the registry caches
+        self._explode(narrow_top)
+        self._explode(wide_top)
+
+        expected = self._count_queries(lambda: self._explode(narrow_top))
+        self.env.invalidate_all()
+        with self.assertQueryCount(expected):
+            entries = self._explode(wide_top)
+        # 20 + 20 * 20 + 20 * 20 * 20 entries, each sub-assembly exploded once
+        self.assertEqual(len(entries), 20 + 20 ** 2 + 20 ** 3)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from odoo.addons.need_mrp_dashboard.models.mrp_dashboard_kpi import SNAPSHOT_COUNT_FIELDS
+from .common import MrpDashboardQueryCase
+
+
+@tagged('post_install', '-at_install')
+class TestMrpDashboardKpi(MrpDashboardQueryCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        product = cls.env['product.product'].create({'name': 'KPI Finished Product', 'type': 'consu'})
+        cls.env['mrp.production'].create([
+            {'product_id': product.id, 'product_qty': 1.0},
+            {'product_id': product.id, 'product_qty': 2.0,
+             'date_start': fields.Datetime.now() - timedelta(days=2)},
+        ])
+
+    def _read_counters(self, cards):
+        cards.invalidate_recordset()
+        return {
+            card.id: (card.count_mo_ready, card.count_mo_waiting, card.count_mo_late, card.count_mo_in_progress)
+            for card in cards
+        }
+
+    def test_counters_match_search_count(self):
+        """The grouped engine gives the numbers of one search_count per counter"""
+        cards = self.env['mrp.dashboard'].create([
+            {'name': 'All Manufacturing'},
+            {'name': 'Work In Progress'},
+            {'name': 'Waiting for Materials'},
+            {'name': 'Urgent', 'custom_domain': "[('priority', '=', '1')]"},
+        ])
+        now = fields.Datetime.now()
+        counters = self._read_counters(cards)
+        Production = self.env['mrp.production']
+        for card in cards:
+            kpis = card._get_mo_kpis(now)
+            expected = tuple(
+                Production.search_count(card._get_mo_domain() + kpis[fname]) for fname in SNAPSHOT_COUNT_FIELDS
+            )
+            self.assertEqual(counters[card.id], expected, card.name)
+
+    def test_query_count_flat_with_cards(self):
+        """Reading more cards sharing a domain does not cost more queries"""
+        Dashboard = self.env['mrp.dashboard']
+        few_cards = Dashboard.create([{'name': f'KPI Card {index}'} for index in range(2)])
+        many_cards = Dashboard.create([{'name': f'KPI Card {index}'} for index in range(2, 12)])
+        # Warm up the registry caches (xmlids, compiled domains)
+        self._read_counters(few_cards)
+
+        expected = self._count_queries(lambda: self._read_counters(few_cards))
+        self._reset_caches()
+        with self.assertQueryCount(expected):
+            self._read_counters(many_cards)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from odoo import Command
+from odoo.tests import tagged
+
+from .common import MrpDashboardQueryCase
+
+
+@tagged('post_install', '-at_install')
+class TestMrpMaterialOverview(MrpDashboardQueryCase):
+
+    def _create_production(self, component_count, prefix):
+        """Draft MO of a BOM with ``component_count`` distinct components"""
+        components = self.env['product.product'].create([
+            {'name': f'{prefix} Component {index}', 'type': 'consu', 'standard_price': 2.0}
+            for index in range(component_count)
+        ])
+        finished = self.env['product.product'].create({'name': f'{prefix} Finished Product', 'type': 'consu'})
+        bom = self.env['mrp.bom'].create({
+            'product_tmpl_id': finished.product_tmpl_id.id,
+            'product_qty': 1.0,
+            'bom_line_ids': [
+                Command.create({'product_id': component.id, 'product_qty': 1.0}) for component in components
+            ],
+        })
+        return self.env['mrp.production'].create({
+            'product_id': finished.id,
+            'product_qty': 1.0,
+            'bom_id': bom.id,
+        })
+
+    def test_overview_components(self):
+        """Every raw move has a component row with its cost"""
+        production = self._create_production(3, 'Small')
+        data = production.get_mo_overview_data()
+        self.assertEqual(len(data['components']), 3)
+        self.assertEqual(
+            sorted(component['summary']['mo_cost'] for component in data['components']), [2.0, 2.0, 2.0])
+        self.assertAlmostEqual(data['summary']['mo_cost'], 6.0)
+
+    def test_query_count_flat_with_components(self):
+        """The overview of a 200-component MO costs the queries of a 10-component one"""
+        small_production = self._create_production(10, 'Small')
+        large_production = self._create_production(200, 'Large')
+        # Warm up the registry caches
+        small_production.get_mo_overview_data()
+
+        expected = self._count_queries(small_production.get_mo_overview_data)
+        self._reset_caches()
+        with self.assertQueryCount(expected):
+            data = large_production.get_mo_overview_data()
+        self.assertEqual(len(data['components']), 200)
+
+    def test_descendants_forget_deleted_mo(self):
+        """A sub MO deleted in the transaction is dropped from the memoized MO trees"""
+        production = self._create_production(1, 'Parent')
+        sub_production = self._create_production(1, 'Child')
+        sub_production.parent_production_id = production
+        self.assertIn(sub_production.id, production._get_mo_descendant_depths()[production.id])
+
+        sub_production.unlink()
+        self.assertEqual(production._get_mo_descendant_depths()[production.id], {})
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from odoo import Command
+from odoo.tests import tagged
+
+from .common import MrpDashboardQueryCase
+
+
+@tagged('post_install', '-at_install')
+class TestMrpWorkorderDashboard(MrpDashboardQueryCase):
+
+    def _create_cards(self, count, prefix):
+        workcenters = self.env['mrp.workcenter'].create([
+            {'name': f'{prefix} Work Center {index}'} for index in range(count)
+        ])
+        return self.env['mrp.workorder.dashboard'].create([
+            {'name': workcenter.name, 'workcenter_id': workcenter.id} for workcenter in workcenters
+        ])
+
+    def _read_cards(self, cards):
+        cards.invalidate_recordset()
+        return {card.id: (card.count_workorders, card.duration_expected) for card in cards}
+
+    def _create_production(self, workcenters, prefix):
+        """Draft MO of a BOM with one 30-minute operation per work center"""
+        component = self.env['product.product'].create({'name': f'{prefix} Component', 'type': 'consu'})
+        finished = self.env['product.product'].create({'name': f'{prefix} Finished Product', 'type': 'consu'})
+        bom = self.env['mrp.bom'].create({
+            'product_tmpl_id': finished.product_tmpl_id.id,
+            'product_qty': 1.0,
+            'bom_line_ids': [Command.create({'product_id': component.id, 'product_qty': 1.0})],
+            'operation_ids': [
+                Command.create({'name': f'{prefix} {workcenter.name}', 'workcenter_id': workcenter.id,
+                                'time_mode': 'manual', 'time_cycle_manual': 30.0})
+                for workcenter in workcenters
+            ],
+        })
+        return self.env['mrp.production'].create({
+            'product_id': finished.id,
+            'product_qty': 2.0,
+            'bom_id': bom.id,
+        })
+
+    def test_counts_match_search(self):
+        """Grouped counts and durations match a search per work center"""
+        cards = self._create_cards(3, 'Routing')
+        open_production, cancelled_production, finishing_production, _draft_production = [
+            self._create_production(cards.workcenter_id, f'Routing MO {index}') for index in range(4)
+        ]
+        (open_production | cancelled_production | finishing_production).action_confirm()
+        # Work orders of cancelled and draft MOs and done work orders are excluded
+        cancelled_production.action_cancel()
+        finishing_production.workorder_ids[:1].write({'state': 'done'})
+
+        counts = self._read_cards(cards)
+        for card in cards:
+            workorders = self.env['mrp.workorder'].search(card._get_workorder_domain())
+            self.assertEqual(counts[card.id][0], len(workorders), card.name)
+            self.assertAlmostEqual(counts[card.id][1], sum(workorders.mapped('duration_expected')), places=2)
+        # One work order per work center for the open MO, one less for the MO being finished
+        self.assertEqual(sum(count for count, _duration in counts.values()), 5)
+        self.assertGreater(sum(duration for _count, duration in counts.values()), 0.0)
+
+    def test_query_count_flat_with_workcenters(self):
+        """Reading more work center cards does not cost more queries"""
+        few_cards = self._create_cards(2, 'Few')
+        many_cards = self._create_cards(20, 'Many')
+
+        expected = self._count_queries(lambda: self._read_cards(few_cards))
+        self._reset_caches()
+        with self.assertQueryCount(expected):
+            self._read_cards(many_cards)